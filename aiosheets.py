@@ -0,0 +1,81 @@
+"""Run independent Sheets calls concurrently on a shared asyncio loop.
+
+gspread is blocking, so each call runs on the loop's thread pool and the
+loop only schedules, times out and cancels them. ``gather`` is the sync
+façade for Streamlit handlers and the background threads::
+
+    roster, ratings = sheets_io().gather(
+        lambda: sheet.worksheet("Members").get_all_records(),
+        lambda: sheet.worksheet("rating").get("A2:C"),
+        timeout=20,
+    )
+
+The calls overlap, so the wait is about the slowest call, not the sum.
+Calls must not ``gather`` themselves: they run on the pool they would wait on.
+"""
+import threading
+from functools import cache
+
+# asyncio is imported when the loop is first needed; it is the bulk of this
+# module's import time and the page shell does not need it
+
+WORKERS = 8
+TIMEOUT = 60
+
+
+class AsyncSheets:
+    """An event loop on a daemon thread with its own pool for blocking calls"""
+
+    def __init__(self, workers=WORKERS, timeout=TIMEOUT):
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.timeout = timeout
+        self.loop = asyncio.new_event_loop()
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="sheets-io")
+        self.loop.set_default_executor(self.executor)
+        self.thread = threading.Thread(target=self.loop.run_forever, name="sheets-loop", daemon=True)
+        self.thread.start()
+
+    async def call(self, fn, timeout=None):
+        """Await the blocking ``fn()`` on the pool, cancelled after ``timeout`` seconds"""
+        import asyncio
+        return await asyncio.wait_for(self.loop.run_in_executor(None, fn), timeout)
+
+    async def gather_async(self, calls, timeout=None, return_exceptions=False):
+        import asyncio
+        return await asyncio.gather(*(self.call(fn, timeout) for fn in calls), return_exceptions=return_exceptions)
+
+    def run(self, coro, timeout=None):
+        """Run ``coro`` on the loop from any other thread and wait for its result"""
+        import asyncio
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout or self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"Sheets calls did not finish in {timeout or self.timeout}s") from None
+
+    def gather(self, *calls, timeout=None, return_exceptions=False):
+        """Run the zero-argument ``calls`` concurrently; results come back in order.
+
+        Each call gets ``timeout`` seconds (default ``self.timeout``). With
+        ``return_exceptions`` a failed call's exception takes its place in the
+        results instead of being raised.
+        """
+        if not calls:
+            return []
+        timeout = timeout or self.timeout
+        return self.run(self.gather_async(calls, timeout, return_exceptions), timeout + 1)
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+@cache
+def sheets_io():
+    """The process-wide ``AsyncSheets`` shared by every club"""
+    return AsyncSheets()
@@ -0,0 +1,218 @@
+"""Minimal JSON check-in API for QR scanners and kiosk tablets.
+
+Endpoints (all JSON):
+
+    POST /checkin/member   {"phone": "..."} or {"token": "..."}
+    POST /checkin/guest    {"name": "...", "phone": "..."}
+    POST /rating           {"name": "...", "rating": 1-5}
+    GET  /health
+    GET  /board            current live board state
+    GET  /board/stream     server-sent events with one message per delta
+
+Pick a club with ``?club=<slug>`` (default: the first configured club).
+With ``api_key`` in the secrets, every request must send it as ``X-API-Key``.
+Check-ins also send ``"code"`` when the club sets ``require_code``.
+
+When ``api_port`` is set in the Streamlit secrets, ``app.py`` starts this
+server on a thread so it shares the app's clubs, member indexes and write
+queues. ``python api.py [PORT]`` runs it standalone with its own registry.
+"""
+import json
+import logging
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from checkin import phone_from_token
+
+logger = logging.getLogger(__name__)
+
+
+class CheckinHandler(BaseHTTPRequestHandler):
+    clubs = None
+    secret = None
+    api_key = None
+    protocol_version = "HTTP/1.1"
+    # Send headers and body in one segment; keep-alive clients otherwise stall on delayed ACKs
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        logger.debug("%s " + format, self.address_string(), *args)
+
+    def send_json(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def club(self):
+        """Resolve ``?club=`` and split it off ``self.path``"""
+        url = urlsplit(self.path)
+        self.path = url.path
+        slug = parse_qs(url.query).get("club", [None])[0]
+        try:
+            club = self.clubs.get(slug)
+        except KeyError:
+            self.send_json(404, {"error": f"unknown club {slug}"})
+            return None
+        self.current, self.service, self.board = club, club.service, club.board
+        return club
+
+    def authorized(self):
+        """Check ``X-API-Key`` when one is configured; sends the 401 itself"""
+        if self.api_key and self.headers.get("X-API-Key") != self.api_key:
+            self.send_json(401, {"error": "invalid API key"})
+            return False
+        return True
+
+    def do_GET(self):
+        # The board lists attendee names, so reads need the key as well
+        if not self.authorized() or self.club() is None:
+            return
+        if self.path == "/health":
+            self.send_json(200, {"ok": True, "queued": len(self.service.queue)})
+        elif self.path == "/board":
+            self.send_json(200, self.board.snapshot())
+        elif self.path == "/board/stream":
+            self.stream_board()
+        else:
+            self.send_json(404, {"error": "not found"})
+
+    def stream_board(self):
+        """Push board deltas as server-sent events until the client disconnects"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        state = self.board.snapshot()
+        version = state["version"]
+        try:
+            self.wfile.write(f"event: snapshot\ndata: {json.dumps(state)}\n\n".encode())
+            self.wfile.flush()
+            while True:
+                deltas = self.board.wait(version)
+                if deltas is None:
+                    state = self.board.snapshot()
+                    version = state["version"]
+                    self.wfile.write(f"event: snapshot\ndata: {json.dumps(state)}\n\n".encode())
+                elif not deltas:
+                    self.wfile.write(b": keep-alive\n\n")
+                for delta in deltas or ():
+                    version = delta["version"]
+                    self.wfile.write(f"data: {json.dumps(delta)}\n\n".encode())
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def do_POST(self):
+        start = time.perf_counter()
+        if not self.authorized():
+            return
+        try:
+            body = self.read_json()
+        except ValueError:
+            self.send_json(400, {"error": "invalid JSON"})
+            return
+        if self.club() is None:
+            return
+
+        if self.path.startswith("/checkin/") and not self.code_ok(body):
+            self.send_json(403, {"error": "valid meeting code required"})
+            return
+
+        route = {
+            "/checkin/member": self.member,
+            "/checkin/guest": self.guest,
+            "/rating": self.rating,
+        }.get(self.path)
+        if route is None:
+            self.send_json(404, {"error": "not found"})
+            return
+        try:
+            status, result = route(body)
+        except Exception as e:
+            logger.exception("Check-in API error")
+            status, result = 500, {"error": str(e)}
+        result["server_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        self.send_json(status, result)
+
+    def code_ok(self, body):
+        """Check-ins carry the meeting code when the club requires one"""
+        return not getattr(self.current, "require_code", False) or self.current.verify_meeting_code(body.get("code") or "")
+
+    def member(self, body):
+        phone = str(body.get("phone") or "").strip()
+        if not phone and body.get("token") and self.secret:
+            phone = phone_from_token(body["token"], self.secret) or ""
+        if not phone:
+            return 400, {"error": "phone or valid token required"}
+        repeat = self.service.already_checked_in(phone)
+        name = self.service.check_in_member(phone)
+        if name is None:
+            return 404, {"error": "Phone number not found in member records."}
+        return 200, {"name": name, "already_checked_in": repeat}
+
+    def guest(self, body):
+        name = str(body.get("name") or "").strip()
+        phone = str(body.get("phone") or "").strip()
+        if not name or not phone:
+            return 400, {"error": "name and phone required"}
+        name, visits, repeat = self.current.check_in_guest(name, phone)
+        return 200, {"name": name, "visits": visits, "already_checked_in": repeat}
+
+    def rating(self, body):
+        try:
+            rating = int(body.get("rating"))
+        except (TypeError, ValueError):
+            rating = 0
+        if not 1 <= rating <= 5:
+            return 400, {"error": "rating must be 1-5"}
+        self.service.rate(str(body.get("name") or ""), rating)
+        return 200, {"rating": rating}
+
+
+def make_server(clubs, port, host="0.0.0.0", secret=None, api_key=None):
+    """``clubs.get(slug)`` must return an object with ``service`` and ``board``"""
+    attrs = {"clubs": clubs, "secret": secret, "api_key": api_key}
+    server = ThreadingHTTPServer((host, port), type("Handler", (CheckinHandler,), attrs))
+    server.daemon_threads = True
+    return server
+
+
+def start_server(clubs, port, **kwargs):
+    """Serve on a daemon thread and return the server"""
+    server = make_server(clubs, port, **kwargs)
+    threading.Thread(target=server.serve_forever, name="checkin-api", daemon=True).start()
+    return server
+
+
+def main(argv):
+    from sharedcache import open_cache
+    from sheets import authorize, load_secrets
+    from sheettrace import traced_client
+    from tenants import TIMEZONE, ClubRegistry, club_configs
+
+    port = int(argv[1]) if len(argv) > 1 else 8502
+    secrets = load_secrets()
+    client = traced_client(authorize(secrets["google_service_account"], secrets.get("http")), secrets.get("trace_file"))
+    registry = ClubRegistry(client, club_configs(secrets),
+                            TIMEZONE, cache=open_cache(secrets.get("shared_cache")))
+    server = make_server(registry, port, secret=secrets.get("token_secret"), api_key=secrets.get("api_key"))
+    print(f"Check-in API listening on :{port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main(sys.argv))
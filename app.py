@@ -1,15 +1,8 @@
 import streamlit as st
-import gspread
-from datetime import datetime, timedelta
-from google.oauth2.service_account import Credentials
+from datetime import datetime
 # from streamlit_star_rating import st_star_rating
-import random
-import string
-import base64
-from zoneinfo import ZoneInfo
-import pytz
-
-ist = pytz.timezone('Asia/Kolkata')
+from profiling import profile_dir, slowest, start_run
+from tenants import TIMEZONE, club_configs
 
 # Page config with custom styling
 st.set_page_config(
@@ -312,15 +305,10 @@ div[data-testid="column"]:last-child button:hover {
 </style>
 """, unsafe_allow_html=True)
 
-# Google Sheets Auth
-SCOPE = [
-    "https://www.googleapis.com/auth/spreadsheets",
-    "https://www.googleapis.com/auth/drive"
-]
-
 @st.cache_resource
 def get_logo_base64():
     """Convert logo to base64 for embedding"""
+    import base64
     try:
         with open("logo.png", "rb") as img_file:
             return base64.b64encode(img_file.read()).decode()
@@ -328,85 +316,100 @@ def get_logo_base64():
         return None
 
 @st.cache_resource
-def init_google_sheets():
-    try:
-        creds = Credentials.from_service_account_info(dict(st.secrets["google_service_account"]), scopes=SCOPE)
-        client = gspread.authorize(creds)   
-        sheet = client.open("Toastmasters Attendance")
-        return sheet
-    except Exception as e:
-        raise e
-
-def get_meeting_code(sheet):
-    """Get active meeting code"""
-    try:
-        meetingcode_sheet = sheet.worksheet("MeetingCode")
-        code_data = meetingcode_sheet.get_all_records()
-        
-        if code_data:
-            expiry_time = datetime.strptime(code_data[0]["Expiry Timestamp"], "%Y-%m-%d %H:%M:%S").replace(tzinfo=ZoneInfo("Asia/Kolkata"))
-            if datetime.now(ist) <= expiry_time:
-                return code_data[0]["Meeting Code"]
-    except Exception:
-        raise e
-
-def create_or_update_attendance_member(sheet, name, phone, today):
-    """Create or update attendance member record"""
-    try:
-        matrix_sheet = sheet.worksheet("Attendance_Member")
-        matrix_data = matrix_sheet.get_all_values()
-        
-        # If sheet is empty, create headers
-        if not matrix_data:
-            matrix_sheet.update("A1:C1", [["Name", "Phone", today]])
-            matrix_sheet.update("A2:C2", [[name, phone, 1]])
-            return True
-            
-        headers = matrix_data[0] if matrix_data else ["Name", "Phone"]
-        
-        # Add today's date as a new column if not present
-        if today not in headers:
-            matrix_sheet.update_cell(1, len(headers) + 1, today)  
-            headers.append(today)
-        
-        # Look for existing member record
-        member_found = False
-        for idx, row in enumerate(matrix_data[1:], start=2):
-            if len(row) > 1 and row[1] == phone:  # Match by phone number
-                # Update existing member
-                col_index = headers.index(today) + 1
-                matrix_sheet.update_cell(idx, col_index, 1)
-                member_found = True
-                break
-        
-        # If member not found, create new record
-        if not member_found:
-            new_row = [name, phone] + [""] * (len(headers) - 2)
-            col_index = headers.index(today)
-            new_row[col_index] = 1
-            matrix_sheet.append_row(new_row)
-            
-        return True
-    except Exception as e:
-        st.error(f"Error updating attendance member sheet: {str(e)}")
-        return False
-
-def generate_meeting_code(sheet):
-    """Generate new meeting code"""
-    try:
-        new_code = "TM" + ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
-        expiry = datetime.now(ist) + timedelta(hours=2)
-        expiry_str = expiry.strftime("%Y-%m-%d %H:%M:%S")
-        
-        meetingcode_sheet = sheet.worksheet("MeetingCode")
-        meetingcode_sheet.clear()
-        meetingcode_sheet.update("A1:B1", [["Meeting Code", "Expiry Timestamp"]])
-        meetingcode_sheet.update("A2:B2", [[new_code, expiry_str]])
-        
-        return new_code, expiry_str
-    except Exception as e:
-        st.error(f"Error generating meeting code: {str(e)}")
-        raise e
+def get_club_registry():
+    """Per-club state in an LRU, all clubs sharing one authorized client"""
+    from sharedcache import open_cache
+    from sheets import TOKEN_CACHE, authorize
+    from sheettrace import traced_client
+    from tenants import ClubRegistry
+
+    client = authorize(st.secrets["google_service_account"], http=st.secrets.get("http"),
+                       token_cache=st.secrets.get("token_cache", TOKEN_CACHE))
+    registry = ClubRegistry(
+        traced_client(client, st.secrets.get("trace_file")),
+        club_configs(st.secrets),
+        TIMEZONE,
+        max_bytes=int(st.secrets.get("club_cache_mb", 64)) * 1024 * 1024,
+        projector_interval=int(st.secrets.get("projector_interval", 15)),
+        cache=open_cache(st.secrets.get("shared_cache")),
+    )
+    port = st.secrets.get("api_port")
+    if port:
+        from api import start_server
+        start_server(registry, int(port), secret=st.secrets.get("token_secret"), api_key=st.secrets.get("api_key"))
+    return registry
+
+@st.fragment(run_every=2)
+def live_board_panel(board):
+    """Apply only the board deltas since this session's last refresh"""
+    view = st.session_state.get('board_view')
+    deltas = board.since(view["version"]) if view else None
+    if deltas is None or any(d["totals"]["date"] != view["totals"]["date"] for d in deltas):
+        view = board.snapshot()
+    else:
+        for delta in deltas:
+            if "attendee" in delta:
+                view["attendees"].append(delta["attendee"])
+            view["version"] = delta["version"]
+            view["totals"] = delta["totals"]
+    st.session_state.board_view = view
+
+    totals = view["totals"]
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Members", totals["members"])
+    col2.metric("Guests", totals["guests"])
+    col3.metric("Avg Rating", totals["average_rating"] or "–", f'{totals["ratings"]} ratings', delta_color="off")
+    st.dataframe(view["attendees"][::-1], use_container_width=True, hide_index=True)
+
+@st.fragment(run_every=5)
+def ratings_panel(aggregator):
+    today = datetime.now(TIMEZONE).strftime("%Y-%m-%d")
+    dates = aggregator.dates()
+    if today not in dates:
+        dates.insert(0, today)
+    date = st.selectbox("Meeting", dates, key="ratings_date")
+    scores = aggregator.get(date)
+    col1, col2 = st.columns(2)
+    col1.metric("Average Rating", scores["mean"] or "–")
+    col2.metric("Ratings", scores["count"])
+    st.bar_chart({"Ratings": {str(k): v for k, v in scores["histogram"].items()}})
+
+SYNCING = " Saved, syncing with Google Sheets."
+WRONG_CODE = "❌ That meeting code is not valid. Check the code shown in the room."
+
+@st.fragment
+def kiosk_panel(club):
+    """Door tablet: stay on the entry forms, confirm with a toast and clear for the next person.
+
+    A submit reruns only this fragment, and the check-in goes to the write-behind queue.
+    """
+    member_tab, guest_tab = st.tabs(["🧑 Member", "🙋‍♂️ Guest"])
+    with member_tab:
+        with st.form("kiosk_member_form", clear_on_submit=True):
+            phone = st.text_input("Phone Number", placeholder="Enter your registered phone number")
+            if st.form_submit_button("Sign In", use_container_width=True) and phone.strip():
+                try:
+                    name = club.service.check_in_member(phone.strip())
+                    if name:
+                        st.toast(f"✅ Welcome, {name}!" + (SYNCING if club.service.degraded else ""))
+                    else:
+                        st.markdown('<div class="error-message">❌ Phone number not found in member records.</div>', unsafe_allow_html=True)
+                except Exception as e:
+                    st.markdown(f'<div class="error-message">❌ Error processing attendance: {str(e)}</div>', unsafe_allow_html=True)
+    with guest_tab:
+        with st.form("kiosk_guest_form", clear_on_submit=True):
+            name = st.text_input("Full Name", placeholder="Enter your full name")
+            phone = st.text_input("Phone Number", placeholder="Enter your phone number")
+            if st.form_submit_button("Sign In", use_container_width=True):
+                if not name.strip() or not phone.strip():
+                    st.markdown('<div class="error-message">❌ Please enter your name and phone number.</div>', unsafe_allow_html=True)
+                else:
+                    try:
+                        name, visits, _ = club.check_in_guest(name, phone.strip())
+                        welcome = f"✅ Welcome back, {name}! Visit #{visits}." if visits > 1 else f"✅ Welcome, {name}!"
+                        st.toast(welcome + (SYNCING if club.service.degraded else ""))
+                    except Exception as e:
+                        st.markdown(f'<div class="error-message">❌ Error processing guest registration: {str(e)}</div>', unsafe_allow_html=True)
 
 # Initialize session state
 if 'step' not in st.session_state:
@@ -417,12 +420,23 @@ if 'show_admin' not in st.session_state:
     st.session_state.show_admin = False
 if 'admin_authenticated' not in st.session_state:
     st.session_state.admin_authenticated = False
-if 'generated_code' not in st.session_state:
-    st.session_state.generated_code = None
-if 'code_expiry' not in st.session_state:
-    st.session_state.code_expiry = None
 if 'user_name' not in st.session_state:
     st.session_state.user_name = None
+if 'kiosk' not in st.session_state:
+    st.session_state.kiosk = False
+if st.query_params.get("admin"):
+    st.session_state.show_admin = True
+if st.query_params.get("kiosk"):
+    st.session_state.kiosk = True
+
+# APP_PROFILE_DIR=... samples this run, tagged with the step it renders
+start_run("admin" if st.session_state.show_admin else "kiosk" if st.session_state.kiosk else st.session_state.step, __file__)
+
+configs = club_configs(st.secrets)
+club_slug = st.query_params.get("club") or st.secrets.get("default_club") or next(iter(configs))
+if club_slug not in configs:
+    st.markdown('<div class="error-message">❌ Unknown club.</div>', unsafe_allow_html=True)
+    st.stop()
 
 # Header with logo
 logo_base64 = get_logo_base64()
@@ -436,18 +450,122 @@ st.markdown(f"""
 <div class="header-container">
     <div class="logo-title">
         {logo_html}
-        <h1>Koramangala Toastmasters Club</h1>
+        <h1>{configs[club_slug].get("title") or club_slug}</h1>
     </div>
 </div>
 """, unsafe_allow_html=True)
 
-# Initialize Google Sheets
-sheet = init_google_sheets()
-if not sheet:
-    st.stop()
+def current_club():
+    """This club's state; the first call authorizes and loads it, so steps that need no data skip it"""
+    return get_club_registry().get(club_slug)
+
+# ADMIN VIEW (open with ?admin=1)
+if st.session_state.show_admin:
+    if not st.session_state.admin_authenticated:
+        with st.form("admin_form"):
+            password = st.text_input("Admin Password", type="password")
+            if st.form_submit_button("Sign In", use_container_width=True):
+                if password and password == st.secrets.get("admin_password"):
+                    st.session_state.admin_authenticated = True
+                    st.rerun()
+                else:
+                    st.markdown('<div class="error-message">❌ Incorrect password.</div>', unsafe_allow_html=True)
+    else:
+        club = current_club()
+        service = club.service
+        st.markdown("""
+        <div class="step-header">
+            <h2>Live Attendance</h2>
+            <p>Updates as people check in</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+        try:
+            # Derived from the secret and the clock; nothing is read or written
+            code, valid_until = club.meeting_code()
+            st.markdown(f'<div class="success-message">Meeting Code: <strong>{code}</strong><br>Valid until {valid_until.strftime("%Y-%m-%d %H:%M")}</div>', unsafe_allow_html=True)
+        except RuntimeError as e:
+            st.markdown(f'<div class="error-message">❌ {str(e)}</div>', unsafe_allow_html=True)
+
+        health = club.health.status()
+        if health["config error"]:
+            st.markdown(f'<div class="error-message">❌ Google Sheets setup problem: {health["config error"]}. Check the spreadsheet name, its worksheets and sharing.</div>', unsafe_allow_html=True)
+        if health["degraded"]:
+            st.markdown(f'<div class="error-message">⚠️ Google Sheets is slow or failing (p50 {health["p50 ms"]} ms, {health["error rate"]:.0%} errors). Check-ins are saved locally and will sync: {len(service.queue)} waiting.</div>', unsafe_allow_html=True)
+
+        live_board_panel(club.board)
+        ratings_panel(club.ratings)
+
+        with st.expander("Guest Follow-ups"):
+            if not service.members.loaded_at:
+                service.members.refresh()
+            member_phones = service.members.roster
+            st.dataframe(club.guests.follow_ups(member_phones), use_container_width=True, hide_index=True)
+            converted = club.guests.conversions(member_phones)
+            if converted:
+                st.markdown(f"**Joined as members:** {len(converted)}")
+                st.dataframe(converted, use_container_width=True, hide_index=True)
+
+        if profile_dir():
+            with st.expander("Slowest Steps"):
+                st.dataframe(slowest(profile_dir()), use_container_width=True, hide_index=True)
+
+        with st.expander("Member Attendance"):
+            if st.button("Show Attendance", key="member_attendance", use_container_width=True):
+                try:
+                    from analytics import summarize
+                    if not club.history.seeded:
+                        club.history.seed(club.sheet)
+                    stats = summarize(club.history.to_matrix())
+                    stats.sort(key=lambda m: (not m["At Risk"], -m["Rate"]))
+                    st.dataframe(stats, use_container_width=True, hide_index=True)
+                except Exception as e:
+                    st.markdown(f'<div class="error-message">❌ Error loading attendance: {str(e)}</div>', unsafe_allow_html=True)
+
+        with st.expander("Meeting Report"):
+            today = datetime.now(TIMEZONE).strftime("%Y-%m-%d")
+            report_dates = club.reports.dates()
+            if today not in report_dates:
+                report_dates.insert(0, today)
+            report_date = st.selectbox("Meeting", report_dates, key="report_date")
+            if st.button("Build Report", key="build_report", use_container_width=True):
+                try:
+                    # Cached per date; rebuilt only after new check-ins or ratings for it
+                    st.session_state.report = club.reports.report(report_date)
+                except Exception as e:
+                    st.markdown(f'<div class="error-message">❌ Error building report: {str(e)}</div>', unsafe_allow_html=True)
+            if st.session_state.get('report'):
+                st.markdown(st.session_state.report)
+                st.download_button("Download", st.session_state.report, file_name=f"meeting-{report_date}.md",
+                                   mime="text/markdown", use_container_width=True)
+
+        with st.expander("Bulk Attendance"):
+            with st.form("bulk_form"):
+                bulk_date = st.date_input("Meeting Date", value=datetime.now(TIMEZONE).date())
+                entries = st.text_area("Phone numbers or names", placeholder="One per line or comma separated")
+                if st.form_submit_button("Mark Present", use_container_width=True):
+                    try:
+                        matched, unknown, ambiguous = service.bulk_check_in(entries.replace(",", "\n").splitlines(), bulk_date)
+                        st.markdown(f'<div class="success-message">✅ Marked {len(matched)} members present for {bulk_date}.</div>', unsafe_allow_html=True)
+                        if unknown:
+                            st.markdown(f'<div class="error-message">❌ Not found: {", ".join(unknown)}</div>', unsafe_allow_html=True)
+                        if ambiguous:
+                            st.markdown(f'<div class="error-message">⚠️ Several members share these names, use phone numbers: {", ".join(ambiguous)}</div>', unsafe_allow_html=True)
+                    except Exception as e:
+                        st.markdown(f'<div class="error-message">❌ Error marking attendance: {str(e)}</div>', unsafe_allow_html=True)
+
+# KIOSK (open with ?kiosk=1 on the door tablet)
+elif st.session_state.kiosk:
+    st.markdown("""
+    <div class="step-header">
+        <h2>Welcome to the Meeting</h2>
+        <p>Check in below, then hand over to the next person</p>
+    </div>
+    """, unsafe_allow_html=True)
+    kiosk_panel(current_club())
 
 # HOME STEP
-if st.session_state.step == 'home':
+elif st.session_state.step == 'home':
     st.markdown("""
     <div class="step-header">
         <h2>Welcome to the Meeting</h2>
@@ -504,33 +622,25 @@ elif st.session_state.step == 'member_login':
     
     with st.form("member_form", clear_on_submit=False):
         phone = st.text_input("Phone Number", placeholder="Enter your registered phone number")
+        code = st.text_input("Meeting Code", placeholder="Shown in the meeting room") if current_club().require_code else None
         submitted = st.form_submit_button("Sign In", use_container_width=True)
         phone = phone.strip()
         if submitted:
             if not phone.strip():
                 st.markdown('<div class="error-message">❌ Please enter your phone number.</div>', unsafe_allow_html=True)
+            elif code is not None and not current_club().verify_meeting_code(code):
+                st.markdown(f'<div class="error-message">{WRONG_CODE}</div>', unsafe_allow_html=True)
             else:
                 try:
-                    members_sheet = sheet.worksheet("Members")
-                    member_records = members_sheet.get_all_records()
-                    matched = next((m for m in member_records if str(m["Phone Number"]) == str(phone)), None)
+                    # Queued to the Events log; the views are projected from it
+                    name = current_club().service.check_in_member(phone)
                     
-                    if matched:
-                        name = matched["Name"]
-                        timestamp = datetime.now(ist).strftime("%Y-%m-%d")
-                        today = datetime.now(ist).strftime("%Y-%m-%d")
-                        
-                        # Log in flat Attendance sheet
-                        attendance_sheet = sheet.worksheet("Attendance")
-                        attendance_sheet.append_row([timestamp, "Member", name, phone, "0000"])
-                        
-                        # Create or update Attendance_Member matrix
-                        if create_or_update_attendance_member(sheet, name, phone, today):
-                            st.session_state.user_name = name
-                            st.session_state.step = 'success'
-                            st.rerun()
-                        else:
-                            st.markdown('<div class="error-message">⚠️ Attendance logged but matrix update failed.</div>', unsafe_allow_html=True)
+                    if name:
+                        st.session_state.user_name = name
+                        st.session_state.guest_visits = 0
+                        st.session_state.syncing = current_club().service.degraded
+                        st.session_state.step = 'success'
+                        st.rerun()
                     else:
                         st.markdown('<div class="error-message">❌ Phone number not found in member records.</div>', unsafe_allow_html=True)
                         
@@ -555,6 +665,7 @@ elif st.session_state.step == 'guest_login':
     with st.form("guest_form", clear_on_submit=False):
         name = st.text_input("Full Name", placeholder="Enter your full name")
         phone = st.text_input("Phone Number", placeholder="Enter your phone number")
+        code = st.text_input("Meeting Code", placeholder="Shown in the meeting room") if current_club().require_code else None
         submitted = st.form_submit_button("Sign In", use_container_width=True)
         phone =phone.strip()
         
@@ -563,19 +674,16 @@ elif st.session_state.step == 'guest_login':
                 st.markdown('<div class="error-message">❌ Please enter your name.</div>', unsafe_allow_html=True)
             elif not phone.strip():
                 st.markdown('<div class="error-message">❌ Please enter your phone number.</div>', unsafe_allow_html=True)
+            elif code is not None and not current_club().verify_meeting_code(code):
+                st.markdown(f'<div class="error-message">{WRONG_CODE}</div>', unsafe_allow_html=True)
             else:
                 try:
-                    timestamp = datetime.now(ist).strftime("%Y-%m-%d")
-                    
-                    # Log in Attendance sheet
-                    attendance_sheet = sheet.worksheet("Attendance")
-                    attendance_sheet.append_row([timestamp, "Guest", name, phone, "0000"])
-                    
-                    # Log in Guest sheet
-                    guest_sheet = sheet.worksheet("Guest")
-                    guest_sheet.append_row([timestamp, name, "None", phone, "0000"])
-                    
+                    # Queued to the Events log; Attendance and Guest are projected from it.
+                    # A guest already checked in today is not written again.
+                    name, visits, _ = current_club().check_in_guest(name, phone)
                     st.session_state.user_name = name
+                    st.session_state.guest_visits = visits
+                    st.session_state.syncing = current_club().service.degraded
                     st.session_state.step = 'success'
                     st.rerun()
                     
@@ -598,6 +706,11 @@ elif st.session_state.step == 'success':
             You've been successfully marked present for today's meeting.
         </div>
         """, unsafe_allow_html=True)
+    if st.session_state.get('syncing'):
+        # Google Sheets is slow right now; the check-in is in the local journal
+        st.markdown(f'<div style="color: #004165; text-align: center; margin-bottom: 1rem;">💾{SYNCING}</div>', unsafe_allow_html=True)
+    if st.session_state.get('guest_visits', 0) > 1:
+        st.markdown(f'<div style="color: #004165; text-align: center; margin-bottom: 1rem;">Welcome back! This is your visit #{st.session_state.guest_visits}.</div>', unsafe_allow_html=True)
         # Add custom CSS for the rating buttons
     st.markdown("""
     <style>
@@ -684,9 +797,7 @@ elif st.session_state.step == 'success':
     # Save to sheet when rating is selected
     if st.session_state.user_rating and 'rating_saved' not in st.session_state:
         try:
-            rating_sheet = sheet.worksheet("rating")
-            timestamp = datetime.now(ist).strftime("%Y-%m-%d")
-            rating_sheet.append_row([timestamp, st.session_state.user_name, st.session_state.user_rating])
+            current_club().service.rate(st.session_state.user_name, st.session_state.user_rating)
             st.session_state.rating_saved = True
             st.markdown('<div style="color: #004165; background: rgba(16, 185, 129, 0.1); border: 1px solid #10B981; padding: 1rem; border-radius: 8px; text-align: center; margin: 1rem 0;">Thanks for rating!</div>', unsafe_allow_html=True)
         except Exception as e:
@@ -699,4 +810,7 @@ elif st.session_state.step == 'success':
             🗳️ &nbsp; Vote for Best Speaker
         </a>
     </div>
-    """, unsafe_allow_html=True)
\ No newline at end of file
+    """, unsafe_allow_html=True)
+
+# The page is drawn; load the club now so the first check-in does not wait for it
+current_club()
@@ -0,0 +1,144 @@
+"""Move old rows out of the flat sheets into compressed local files.
+
+Rows dated before the cutoff are written to ``<dir>/<sheet>/`` as zstd Arrow
+files (the ``snapshot`` format), then removed from the live sheet. One
+summary row is left behind as row 2: its second cell starts with
+``[archived`` so every reader in this repo skips it.
+
+``Events`` is not archived: it stays the full source of truth, and a
+``Projector.rebuild`` will restore archived rows to the views.
+
+Usage::
+
+    python archive.py 2025-01-01            # dry run
+    python archive.py 2025-01-01 --apply [--dir archive]
+"""
+import json
+import os
+import sys
+
+import pyarrow as pa
+
+from snapshot import to_table, to_values
+
+ARCHIVED_SHEETS = ["Attendance", "Guest", "rating"]
+DEFAULT_DIR = "archive"
+MARKER = "[archived"
+
+
+def is_summary(row):
+    return len(row) > 1 and str(row[1]).startswith(MARKER)
+
+
+def manifest_path(directory, name):
+    return os.path.join(directory, name, "manifest.json")
+
+
+def read_manifest(directory, name):
+    try:
+        with open(manifest_path(directory, name)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"parts": []}
+
+
+def archived_rows(name, directory=DEFAULT_DIR):
+    """All archived data rows of ``name`` (no header), oldest part first"""
+    rows = []
+    for part in read_manifest(directory, name)["parts"]:
+        path = os.path.join(directory, name, part["file"])
+        table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+        rows.extend(to_values(table)[1:])
+    return rows
+
+
+def merged_values(sheet, name, directory=DEFAULT_DIR):
+    """``get_all_values`` of ``name`` with archived rows put back in place of the summary"""
+    live = sheet.worksheet(name).get_all_values()
+    if not live:
+        return live
+    return [live[0]] + archived_rows(name, directory) + [r for r in live[1:] if not is_summary(r)]
+
+
+def split(values, cutoff):
+    """Sheet row numbers and values of every row dated before ``cutoff`` (summaries excluded).
+
+    Rows are not assumed sorted: bulk reconciliation appends back-dated rows.
+    """
+    numbers, old = [], []
+    for number, row in enumerate(values[1:], 2):
+        if row and row[0] and row[0][:10] < cutoff and not is_summary(row):
+            numbers.append(number)
+            old.append(row)
+    return numbers, old
+
+
+def runs(numbers):
+    """Contiguous ``(first, last)`` runs of ascending row numbers, bottom run first"""
+    blocks = []
+    for number in numbers:
+        if blocks and blocks[-1][1] == number - 1:
+            blocks[-1][1] = number
+        else:
+            blocks.append([number, number])
+    return [tuple(block) for block in reversed(blocks)]
+
+
+def archive_sheet(sheet, name, cutoff, directory=DEFAULT_DIR, apply=False):
+    ws = sheet.worksheet(name)
+    values = ws.get_all_values()
+    numbers, old = split(values, cutoff)
+    if not apply or not old:
+        return len(old)
+
+    manifest = read_manifest(directory, name)
+    os.makedirs(os.path.join(directory, name), exist_ok=True)
+    # Numbered parts: archiving again with the same cutoff adds a part, never replaces one
+    file = f"{name}-{len(manifest['parts']) + 1:04d}-before-{cutoff}.arrow"
+    if os.path.exists(os.path.join(directory, name, file)):
+        raise FileExistsError(f"{file} exists but is not in the manifest; refusing to overwrite it")
+    options = pa.ipc.IpcWriteOptions(compression="zstd")
+    table = to_table([values[0]] + old)
+    with pa.OSFile(os.path.join(directory, name, file), "wb") as sink, \
+            pa.ipc.new_file(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+    manifest["parts"].append({"file": file, "rows": len(old), "cutoff": cutoff})
+    with open(manifest_path(directory, name), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    # Archive files are written; only now touch the live sheet
+    total = sum(p["rows"] for p in manifest["parts"])
+    width = max(len(values[0]), len(values[1]))
+    summary = [cutoff, f"{MARKER} {total} rows before {cutoff}]"] + [""] * (width - 2)
+    if is_summary(values[1]) or numbers[0] == 2:
+        # Row 2 is the last summary or an archived row: overwrite it in place
+        ws.update("A2", [summary])
+        numbers = [n for n in numbers if n != 2]
+    else:
+        ws.insert_row(summary, 2)
+        numbers = [n + 1 for n in numbers]
+    # Bottom block first so the row numbers above it stay put
+    for first, last in runs(numbers):
+        ws.delete_rows(first, last)
+    return len(old)
+
+
+def main(argv):
+    from sheets import open_spreadsheet
+
+    args = [a for a in argv[1:] if not a.startswith("--")]
+    if not args:
+        print(__doc__)
+        return 2
+    cutoff = args[0]
+    directory = argv[argv.index("--dir") + 1] if "--dir" in argv else DEFAULT_DIR
+    apply = "--apply" in argv
+    sheet = open_spreadsheet()
+    for name in ARCHIVED_SHEETS:
+        moved = archive_sheet(sheet, name, cutoff, directory, apply)
+        print(f"{name}: {moved} rows {'archived' if apply else 'would be archived'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
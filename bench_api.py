@@ -0,0 +1,76 @@
+"""Requests/sec of the JSON check-in API versus the Streamlit member flow.
+
+    python bench_api.py                        # API only, in-memory roster
+    python bench_api.py --streamlit PHONE      # also drive app.py via AppTest
+
+The API run uses a seeded member index and does not start the write queue,
+so it measures the server's own cost per check-in. The Streamlit run needs
+real secrets because it executes ``app.py`` end to end.
+"""
+import http.client
+import json
+import statistics
+import sys
+import threading
+import time
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+from api import make_server
+from checkin import CheckinService
+
+MEMBERS = [{"Name": f"Member {i}", "Phone Number": 9000000000 + i} for i in range(500)]
+
+
+def bench_api(requests=5000, clients=8):
+    service = CheckinService(None, ZoneInfo("Asia/Kolkata"), seed_records=MEMBERS)
+    club = SimpleNamespace(service=service, board=None)
+    server = make_server(SimpleNamespace(get=lambda slug: club), 0, host="127.0.0.1")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    server_ms = []
+
+    def client(n, offset):
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        for i in range(n):
+            body = json.dumps({"phone": str(9000000000 + (offset + i) % len(MEMBERS))}).encode()
+            conn.request("POST", "/checkin/member", body, {"Content-Type": "application/json"})
+            server_ms.append(json.loads(conn.getresponse().read())["server_ms"])
+        conn.close()
+
+    per_client = requests // clients
+    threads = [threading.Thread(target=client, args=(per_client, c * per_client)) for c in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+    server_ms.sort()
+    return {
+        "requests/sec": round(len(server_ms) / elapsed),
+        "server p50 ms": statistics.median(server_ms),
+        "server p99 ms": server_ms[int(len(server_ms) * 0.99)],
+        "queued rows": len(service.queue),
+    }
+
+
+def bench_streamlit(phone, rounds=5):
+    from streamlit.testing.v1 import AppTest
+
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        at = AppTest.from_file("app.py", default_timeout=30).run()
+        at.button(key="member_select").click().run()
+        at.text_input[0].input(phone)
+        at.button[-1].click().run()
+        times.append(time.perf_counter() - start)
+    return {"check-ins/sec": round(rounds / sum(times), 2), "mean ms": round(statistics.mean(times) * 1000)}
+
+
+if __name__ == "__main__":
+    print("API:", bench_api())
+    if "--streamlit" in sys.argv:
+        print("Streamlit:", bench_streamlit(sys.argv[sys.argv.index("--streamlit") + 1]))
@@ -0,0 +1,77 @@
+"""Check that concurrent Sheets calls don't serialize on the HTTP pool.
+
+Runs a local server that answers every request after a fixed delay, then
+issues the same burst of requests from many threads through sessions built
+by ``sheets.make_session``. With a healthy pool the burst takes about
+``requests / threads`` round trips; a pool that serializes takes ``requests``.
+
+    python bench_http.py
+"""
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from google.auth.credentials import AnonymousCredentials
+
+from sheets import http_config, make_session
+
+DELAY = 0.02
+THREADS = 16
+PER_THREAD = 8
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        time.sleep(DELAY)
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+def burst(session, url):
+    def worker():
+        for _ in range(PER_THREAD):
+            session.get(url, timeout=5).content
+
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    serial = THREADS * PER_THREAD * DELAY
+
+    ok = True
+    cases = {
+        "pool of 1 (serialized)": {"pool_size": 1, "pool_block": True},
+        "shared pool": {},
+        "per-thread sessions": {"per_thread": True},
+    }
+    for label, overrides in cases.items():
+        elapsed = burst(make_session(AnonymousCredentials(), http_config(overrides)), url)
+        print(f"{label:24} {elapsed * 1000:7.0f} ms  ({serial / elapsed:4.1f}x vs serial)")
+        if overrides.get("pool_size") != 1:
+            ok = ok and elapsed < serial / 4
+    server.shutdown()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""Memory per member of the cached roster at 10k members.
+
+    python bench_roster.py [--members N] [--budget BYTES]
+
+Measures with ``tracemalloc`` three ways of holding the same roster:
+``get_all_records()`` output, the phone and name dicts ``MemberIndex`` used
+to keep, and ``checkin.Roster``. Exits 1 if ``Roster`` costs more than the
+budget per member.
+"""
+import sys
+import tracemalloc
+
+from checkin import Roster
+
+MEMBERS = 10_000
+BUDGET = 120
+FIRST = ["Asha", "Rahul", "Priya", "Vikram", "Meera", "Arjun", "Divya", "Karthik", "Sneha", "Rohan"]
+LAST = ["Rao", "Sharma", "Iyer", "Reddy", "Nair", "Menon", "Gupta", "Shetty", "Kumar", "Das"]
+
+
+def rows(n):
+    """``get_all_values()``-shaped rows, built fresh so nothing is shared between runs"""
+    return [["Name", "Phone Number"]] + [
+        [f"{FIRST[i % 10]} {LAST[i // 10 % 10]} {i // 100}", str(9000000000 + i)] for i in range(n)
+    ]
+
+
+def as_records(values):
+    header = values[0]
+    return [dict(zip(header, row)) for row in values[1:]]
+
+
+def as_dicts(values):
+    by_phone, by_name = {}, {}
+    for name, phone in values[1:]:
+        by_phone[phone] = name
+        by_name.setdefault(name.strip().lower(), set()).add(phone)
+    return by_phone, by_name
+
+
+def as_roster(values):
+    roster = Roster()
+    roster.update((phone, name) for name, phone in values[1:])
+    return roster
+
+
+def measure(build, n):
+    """Bytes ``build``'s result keeps alive, strings included, once the input rows are gone"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    values = rows(n)
+    result = build(values)
+    del values
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return after - before
+
+
+def main(argv):
+    n = int(argv[argv.index("--members") + 1]) if "--members" in argv else MEMBERS
+    budget = int(argv[argv.index("--budget") + 1]) if "--budget" in argv else BUDGET
+    results = {
+        "get_all_records": measure(as_records, n),
+        "phone/name dicts": measure(as_dicts, n),
+        "Roster": measure(as_roster, n),
+    }
+    for label, size in results.items():
+        print(f"{label:<18}{size / 1024:>9.0f} KiB{size / n:>8.0f} B/member")
+    if results["Roster"] / n > budget:
+        print(f"FAIL: Roster over {budget} B/member")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
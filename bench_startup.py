@@ -0,0 +1,82 @@
+"""Cold-start import budget for ``app.py``.
+
+    python bench_startup.py [--budget MS]
+
+Imports the modules ``app.py`` imports at top level (read from its source)
+in a fresh interpreter with ``-X importtime``, after Streamlit itself, and
+adds up their cumulative time. Exits 1 if the best of five runs is over the
+budget or if any of the heavy modules that should load on first use
+(gspread, google-auth, requests, numpy, pyarrow, asyncio) is pulled in.
+"""
+import ast
+import subprocess
+import sys
+
+APP = "app.py"
+BUDGET_MS = 150
+RUNS = 5
+PRELOAD = ["streamlit"]
+LAZY = ["gspread", "google", "requests", "numpy", "pyarrow", "pytz", "asyncio"]
+
+
+def top_level_imports(path=APP):
+    """Top-level module names imported at module scope of ``path``"""
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names.extend(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.append(node.module.split(".")[0])
+    return sorted(set(names) - set(PRELOAD))
+
+
+def script(modules, after_preload=""):
+    preload = "".join(f"try:\n    import {m}\nexcept ImportError:\n    pass\n" for m in PRELOAD)
+    return preload + after_preload + "".join(f"import {m}\n" for m in modules)
+
+
+def measure(modules):
+    """Milliseconds spent importing ``modules`` after the preload"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", script(modules)],
+                            capture_output=True, text=True, check=True)
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Level 0 rows are the modules imported directly by the script
+        if name[1:] in modules and name[1] != " ":
+            total += int(cumulative)
+    return total / 1000
+
+
+def loaded_lazy_modules(modules):
+    """Heavy modules that ``modules`` pull in (Streamlit may already load some itself)"""
+    check = script(modules, "import sys\npreloaded = set(sys.modules)\n") + (
+        f"print(' '.join(m for m in {LAZY!r} if m in sys.modules and m not in preloaded))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", check], capture_output=True, text=True, check=True)
+    return result.stdout.split()
+
+
+def main(argv):
+    budget = float(argv[argv.index("--budget") + 1]) if "--budget" in argv else BUDGET_MS
+    modules = top_level_imports()
+    best = min(measure(modules) for _ in range(RUNS))
+    eager = loaded_lazy_modules(modules)
+    print(f"app.py imports: {', '.join(modules)}")
+    print(f"import time: {best:.1f} ms (budget {budget:.0f} ms)")
+    failed = False
+    if eager:
+        print(f"FAIL: imported at startup, should load on first use: {', '.join(eager)}")
+        failed = True
+    if best > budget:
+        print("FAIL: over budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,514 @@
+"""Check-in service shared by the Streamlit app and the HTTP API.
+
+Holds the cached member index and the write-behind queue, so a check-in is a
+dictionary lookup plus an in-memory enqueue. The queue drains to the sheets
+on a background thread with one ``append_rows`` call per worksheet.
+"""
+import hashlib
+import hmac
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime
+
+from aiosheets import sheets_io
+from eventlog import EVENTS_SHEET, GUEST, MEMBER, events_on, make_event
+
+RATING_SHEET = "rating"
+
+logger = logging.getLogger(__name__)
+
+
+def member_token(phone, secret):
+    """Opaque token for a member QR code: ``<phone>.<hmac>``"""
+    digest = hmac.new(secret.encode(), str(phone).encode(), hashlib.sha256).hexdigest()[:16]
+    return f"{phone}.{digest}"
+
+
+def phone_from_token(token, secret):
+    """Return the phone encoded in ``token`` or None if the signature is wrong"""
+    phone, _, _ = token.rpartition(".")
+    if phone and hmac.compare_digest(member_token(phone, secret), token):
+        return phone
+    return None
+
+
+CODE_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"   # no 0/O or 1/I to misread
+CODE_WINDOW = 120 * 60
+CODE_GRACE = 15 * 60
+
+
+def meeting_code(secret, window, scope=""):
+    """``TM`` + 4 characters derived from ``secret`` and the window number (TOTP-style)"""
+    digest = hmac.new(secret.encode(), f"{scope}:{window}".encode(), hashlib.sha256).digest()
+    number = int.from_bytes(digest[:8], "big")
+    chars = []
+    for _ in range(4):
+        number, index = divmod(number, len(CODE_ALPHABET))
+        chars.append(CODE_ALPHABET[index])
+    return "TM" + "".join(chars)
+
+
+def code_window(timestamp, window=CODE_WINDOW, start=0):
+    """Window number and the time it ends, for ``timestamp``.
+
+    Windows are aligned so one begins ``start`` seconds after midnight: with
+    a 19:00 start and two-hour windows the code does not change mid-meeting.
+    """
+    number = int((timestamp - start) // window)
+    return number, start + (number + 1) * window
+
+
+def verify_meeting_code(code, secret, timestamp, scope="", window=CODE_WINDOW, grace=CODE_GRACE, start=0):
+    """True if ``code`` is this window's, or the last window's and it ended under ``grace`` seconds ago"""
+    code = str(code).strip().upper()
+    number, ends = code_window(timestamp, window, start)
+    candidates = [number]
+    if timestamp - (ends - window) < grace:
+        candidates.append(number - 1)
+    return any(hmac.compare_digest(meeting_code(secret, n, scope), code) for n in candidates)
+
+
+class Roster:
+    """Members as parallel columns: a sorted ``array`` of phone numbers and their names.
+
+    Eight bytes per phone instead of a string and a dict entry, and no
+    per-row dict, so the roster stays small when many clubs are cached.
+    Lookups bisect the array. Phones that are not plain numbers (a ``+``, a
+    leading zero) go in a small side dict. The name index is only needed
+    for bulk attendance, so it is built on first use.
+    """
+
+    __slots__ = ("phones", "names", "other", "_name_index")
+
+    def __init__(self):
+        self.phones = array("q")
+        self.names = []
+        self.other = {}
+        self._name_index = None
+
+    @staticmethod
+    def key(phone):
+        """The int stored for ``phone``, or None if it must stay a string"""
+        phone = str(phone).strip()
+        if phone.isdigit() and phone[0] != "0" and len(phone) < 19:
+            return int(phone)
+        return None
+
+    @classmethod
+    def from_pairs(cls, pairs):
+        roster = cls()
+        roster.update(pairs)
+        return roster
+
+    def update(self, pairs):
+        """Add or rename many ``(phone, name)`` pairs, rebuilding the columns once"""
+        merged = dict(zip(self.phones, self.names))
+        for phone, name in pairs:
+            key = self.key(phone)
+            if key is None:
+                self.other[str(phone).strip()] = str(name)
+            else:
+                merged[key] = str(name)
+        keys = sorted(merged)
+        self.phones = array("q", keys)
+        self.names = [merged[k] for k in keys]
+        self._name_index = None
+
+    def add(self, phone, name):
+        self.update([(phone, name)])
+
+    def _slot(self, key):
+        slot = bisect_left(self.phones, key)
+        return slot if slot < len(self.phones) and self.phones[slot] == key else None
+
+    def get(self, phone, default=None):
+        key = self.key(phone)
+        if key is None:
+            return self.other.get(str(phone).strip(), default)
+        slot = self._slot(key)
+        return default if slot is None else self.names[slot]
+
+    def __contains__(self, phone):
+        return self.get(phone) is not None
+
+    def __len__(self):
+        return len(self.phones) + len(self.other)
+
+    def items(self):
+        yield from zip(map(str, self.phones), self.names)
+        yield from self.other.items()
+
+    def phones_named(self, name):
+        """Phones of every member called ``name`` (case-insensitive)"""
+        if self._name_index is None:
+            index = {}
+            for phone, member in self.items():
+                index.setdefault(member.strip().lower(), []).append(phone)
+            self._name_index = index
+        return self._name_index.get(name.strip().lower(), [])
+
+    def nbytes(self):
+        """Approximate size: the columns and the distinct names they hold"""
+        names = sum(map(sys.getsizeof, set(self.names)))
+        other = sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in self.other.items())
+        return sys.getsizeof(self.phones) + sys.getsizeof(self.names) + sys.getsizeof(self.other) + names + other
+
+
+class MemberIndex:
+    """Phone -> member name, loaded once and refreshed on a miss.
+
+    A refresh replaces the roster, so members removed from ``Members`` stop
+    matching.
+
+    With a shared ``cache`` (see ``sharedcache``), a refresh first takes a
+    roster another replica read recently and only reads ``Members`` itself
+    when none is fresh enough.
+    """
+
+    def __init__(self, sheet, seed_records=(), min_refresh=30, cache=None, cache_key="members"):
+        self.sheet = sheet
+        self.min_refresh = min_refresh
+        self.cache = cache
+        self.cache_key = cache_key
+        self.version = 0
+        self.roster = Roster.from_pairs((r["Phone Number"], r["Name"]) for r in seed_records)
+        self.loaded_at = 0.0
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        with self.lock:
+            if self.cache is not None:
+                roster, version, updated = self.cache.get(self.cache_key)
+                if version > self.version and time.time() - updated < self.min_refresh:
+                    self.roster = Roster.from_pairs(roster.items())
+                    self.version = version
+                    self.loaded_at = time.monotonic()
+                    return
+            # Rows, not get_all_records(): no dict per member just to pick two columns
+            values = self.sheet.worksheet("Members").get_all_values()
+            if values:
+                header = values[0]
+                phone_col, name_col = header.index("Phone Number"), header.index("Name")
+                self.roster = Roster.from_pairs(
+                    (row[phone_col], row[name_col]) for row in values[1:] if len(row) > max(phone_col, name_col)
+                )
+            if self.cache is not None:
+                self.version = self.cache.set(self.cache_key, dict(self.roster.items()))
+            self.loaded_at = time.monotonic()
+
+    def lookup(self, phone, refresh=True):
+        """Member name for ``phone``; ``refresh=False`` answers from the cached roster only"""
+        phone = str(phone).strip()
+        name = self.roster.get(phone)
+        if name is None and refresh and self.sheet is not None and time.monotonic() - self.loaded_at > self.min_refresh:
+            # Unknown phone: maybe a member added since the last read
+            self.refresh()
+            name = self.roster.get(phone)
+        return name
+
+    def resolve(self, entries):
+        """Match pasted phones or names to members.
+
+        Returns ``(matched, unknown, ambiguous)`` where ``matched`` is a list of
+        ``(name, phone)`` pairs without duplicates.
+        """
+        if self.sheet is not None and not self.loaded_at:
+            self.refresh()
+        matched, unknown, ambiguous, seen = [], [], [], set()
+        for entry in entries:
+            phone = entry if entry in self.roster else None
+            if phone is None:
+                phones = self.roster.phones_named(entry)
+                if len(phones) > 1:
+                    ambiguous.append(entry)
+                    continue
+                phone = next(iter(phones), None)
+            if phone is None:
+                unknown.append(entry)
+            elif phone not in seen:
+                seen.add(phone)
+                matched.append((self.roster.get(phone), phone))
+        return matched, unknown, ambiguous
+
+
+class Journal:
+    """Local JSONL copy of the rows still queued, so a restart or a Sheets outage loses nothing"""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                return [tuple(json.loads(line)) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def append(self, entries):
+        with open(self.path, "a") as f:
+            f.writelines(json.dumps(entry) + "\n" for entry in entries)
+
+    def rewrite(self, entries):
+        with open(self.path + ".tmp", "w") as f:
+            f.writelines(json.dumps(entry) + "\n" for entry in entries)
+        os.replace(self.path + ".tmp", self.path)
+
+
+class WriteQueue:
+    """Write-behind buffer of rows to append, flushed in batches per worksheet.
+
+    With a ``journal`` every queued row is also on disk until Sheets has it,
+    and rows left over from a previous run are queued again at start. While
+    ``health`` reports Sheets degraded, nothing is sent and rows wait there.
+    """
+
+    def __init__(self, sheet, interval=2.0, journal=None, health=None):
+        self.sheet = sheet
+        self.interval = interval
+        self.journal = journal
+        self.health = health
+        self.pending = journal.load() if journal else []
+        self.cond = threading.Condition()
+        self.thread = None
+        self.stopped = False
+
+    def put(self, worksheet, row):
+        self.put_many(worksheet, [row])
+
+    def put_many(self, worksheet, rows):
+        with self.cond:
+            entries = [(worksheet, row) for row in rows]
+            self.pending.extend(entries)
+            if self.journal:
+                self.journal.append(entries)
+            self.cond.notify()
+        if self.stopped:
+            # A caller still holding a closed club; write through instead of losing rows
+            self.flush()
+
+    def __len__(self):
+        return len(self.pending)
+
+    def flush(self):
+        """Append everything queued so far. Failed batches go back on the queue."""
+        if self.health is not None and self.health.degraded:
+            return 0
+        with self.cond:
+            batch, self.pending = self.pending, []
+        grouped = defaultdict(list)
+        for worksheet, row in batch:
+            grouped[worksheet].append(row)
+        # One append per worksheet, all in flight at once
+        start = time.perf_counter()
+        results = sheets_io().gather(
+            *(lambda w=worksheet, r=rows: self.sheet.worksheet(w).append_rows(r) for worksheet, rows in grouped.items()),
+            return_exceptions=True,
+        )
+        ms = (time.perf_counter() - start) * 1000
+        for (worksheet, rows), result in zip(grouped.items(), results):
+            failed = isinstance(result, BaseException)
+            if self.health is not None:
+                if failed:
+                    self.health.record_error(ms, result)
+                else:
+                    self.health.record(ms, True)
+            if failed:
+                logger.error("Writing %d rows to %s failed; will retry", len(rows), worksheet, exc_info=result)
+                with self.cond:
+                    self.pending[:0] = [(worksheet, r) for r in rows]
+        if self.journal and batch:
+            with self.cond:
+                self.journal.rewrite(self.pending)
+        return len(batch)
+
+    def start(self):
+        def loop():
+            while not self.stopped:
+                with self.cond:
+                    while not self.pending and not self.stopped:
+                        self.cond.wait()
+                # Let a burst of check-ins collect into one batch
+                time.sleep(self.interval)
+                self.flush()
+
+        self.thread = threading.Thread(target=loop, name="write-queue", daemon=True)
+        self.thread.start()
+        return self.thread
+
+    def stop(self):
+        """Stop the background thread and write out whatever is still queued"""
+        with self.cond:
+            self.stopped = True
+            self.cond.notify()
+        self.flush()
+
+
+class CheckinService:
+    """Member lookup and check-in recording shared by every front end"""
+
+    def __init__(self, sheet, tz, seed_records=(), flush_interval=2.0, cache=None, cache_prefix="",
+                 journal=None, health=None):
+        self.sheet = sheet
+        self.tz = tz
+        self.health = health
+        self.members = MemberIndex(sheet, seed_records, cache=cache, cache_key=f"{cache_prefix}members")
+        self.queue = WriteQueue(sheet, flush_interval, journal, health)
+        self.listeners = []
+        # Phones already checked in at today's meeting, so repeat clicks write nothing
+        self.seen_date = None
+        self.seen = set()
+        self.seen_lock = threading.Lock()
+
+    def start(self):
+        self.queue.start()
+        return self
+
+    def stop(self):
+        self.queue.stop()
+
+    def now(self):
+        return datetime.now(self.tz)
+
+    def subscribe(self, listener):
+        """Call ``listener(event)`` for every check-in and rating recorded"""
+        self.listeners.append(listener)
+
+    def notify(self, event):
+        for listener in self.listeners:
+            try:
+                listener(event)
+            except Exception:
+                logger.exception("Check-in listener failed")
+
+    def record(self, kind, name, phone):
+        return self.record_many(kind, [(name, phone)], self.now())[0]
+
+    def record_many(self, kind, people, timestamp):
+        rows = [make_event(kind, name, str(phone).strip(), timestamp) for name, phone in people]
+        self.queue.put_many(EVENTS_SHEET, rows)
+        for row in rows:
+            self.notify({"type": kind, "name": row[4], "phone": row[5], "date": row[2], "time": row[1][11:]})
+        return rows
+
+    @property
+    def degraded(self):
+        """True while Sheets is too slow or failing and writes wait in the journal"""
+        return self.health is not None and self.health.degraded
+
+    def today(self):
+        return self.now().strftime("%Y-%m-%d")
+
+    def _roll(self, date):
+        if date != self.seen_date:
+            self.seen_date, self.seen = date, set()
+
+    def mark_seen(self, phone):
+        """Add ``phone`` to today's seen-set. False if it was already there."""
+        phone = str(phone).strip()
+        with self.seen_lock:
+            self._roll(self.today())
+            if phone in self.seen:
+                return False
+            self.seen.add(phone)
+            return True
+
+    def unmark_seen(self, phones):
+        """Take ``phones`` back out of today's seen-set after their event failed to record"""
+        with self.seen_lock:
+            if self.seen_date == self.today():
+                self.seen.difference_update(str(p).strip() for p in phones)
+
+    def already_checked_in(self, phone):
+        with self.seen_lock:
+            return self.seen_date == self.today() and str(phone).strip() in self.seen
+
+    def day_events(self, day):
+        """``day``'s check-ins from ``Events`` and from the rows still queued, oldest first.
+
+        Queued rows include any left in the journal by a previous run, so a
+        restart during an outage does not forget who is already in.
+        """
+        rows = events_on(self.sheet, day, full=True)
+        written = {row[0] for row in rows}
+        with self.queue.cond:
+            queued = [row for worksheet, row in self.queue.pending if worksheet == EVENTS_SHEET]
+        rows += [row for row in queued if row[2] == day and row[0] not in written]
+        return [{"type": row[3], "name": row[4], "phone": str(row[5]).strip(), "date": row[2], "time": str(row[1])[11:]}
+                for row in rows]
+
+    def today_events(self):
+        return self.day_events(self.today())
+
+    def seed_seen(self, events=None):
+        """Mark today's member check-ins seen, from ``events`` or ``today_events()``.
+
+        Returns the number of phones marked seen.
+        """
+        if events is None:
+            events = self.today_events()
+        phones = {event["phone"] for event in events if event["type"] == MEMBER}
+        with self.seen_lock:
+            self._roll(self.today())
+            self.seen.update(phones)
+            return len(self.seen)
+
+    def check_in_member(self, phone):
+        """Record a member check-in. Returns the member name, or None if unknown.
+
+        A member already checked in today gets their name back without a new event.
+        """
+        name = self.members.lookup(phone, refresh=not self.degraded)
+        if name is not None and self.mark_seen(phone):
+            try:
+                self.record(MEMBER, name, phone)
+            except Exception:
+                # Not recorded, so not checked in: let them try again
+                self.unmark_seen([phone])
+                raise
+        return name
+
+    def bulk_check_in(self, entries, date):
+        """Mark many members present on ``date`` (post-meeting reconciliation).
+
+        Members already checked in on ``date`` get no second event.
+
+        All events go into the queue together, so they reach ``Events`` in one
+        ``append_rows``; the projector then writes the ``Attendance`` rows and the
+        matrix cells in one append and one batch update.
+        """
+        matched, unknown, ambiguous = self.members.resolve([e.strip() for e in entries if e.strip()])
+        timestamp = datetime.combine(date, self.now().timetz())
+        day = date.strftime("%Y-%m-%d")
+        if day == self.today():
+            new = [(name, phone) for name, phone in matched if self.mark_seen(phone)]
+        else:
+            # Past meetings have no seen-set; skip members already in that date's events, queued ones included
+            present = {event["phone"] for event in self.day_events(day) if event["type"] == MEMBER}
+            new = [(name, phone) for name, phone in matched if phone not in present]
+        try:
+            self.record_many(MEMBER, new, timestamp)
+        except Exception:
+            if day == self.today():
+                self.unmark_seen(phone for _, phone in new)
+            raise
+        self.queue.flush()
+        return matched, unknown, ambiguous
+
+    def check_in_guest(self, name, phone):
+        self.record(GUEST, name.strip(), phone)
+        return name.strip()
+
+    def rate(self, name, rating):
+        date = self.now().strftime("%Y-%m-%d")
+        self.queue.put(RATING_SHEET, [date, name, int(rating)])
+        self.notify({"type": "Rating", "name": name, "rating": int(rating), "date": date})
@@ -0,0 +1,398 @@
+"""Append-only check-in event log and the projector that derives the views.
+
+Every check-in is a single row appended to the ``Events`` worksheet. The
+``Attendance`` flat log, the ``Guest`` sheet and the ``Attendance_Member``
+matrix are projections of that log: the projector reads the events a view has
+not seen yet, applies them with one batched write per view and then advances
+that view's cursor, so a failed write is retried for that view only.
+Replaying the whole log with ``rebuild`` always gives the same views.
+
+Usage::
+
+    python eventlog.py migrate    # seed Events from an existing Attendance sheet
+    python eventlog.py project    # apply new events to the views
+    python eventlog.py rebuild    # regenerate all views from scratch
+"""
+import logging
+import os
+import socket
+import sys
+import threading
+import uuid
+
+from aiosheets import sheets_io
+
+EVENTS_SHEET = "Events"
+PROJECTOR_SHEET = "Projector"
+EVENT_HEADERS = ["Event ID", "Timestamp", "Date", "Type", "Name", "Phone"]
+MATRIX_HEADERS = ["Name", "Phone"]
+# Each view keeps its own cursor in the Projector sheet: view names in row 1, last event row in row 2
+VIEWS = ("Attendance", "Guest", "Attendance_Member")
+LEGACY_CURSOR = "Last Event Row"
+
+LEASE_TTL = 120
+
+MEMBER = "Member"
+GUEST = "Guest"
+
+logger = logging.getLogger(__name__)
+
+
+def make_event(kind, name, phone, timestamp):
+    """Build an event row; ``timestamp`` is an aware datetime"""
+    return [
+        uuid.uuid4().hex[:12],
+        timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+        timestamp.strftime("%Y-%m-%d"),
+        kind,
+        name,
+        str(phone),
+    ]
+
+
+def parse_event(row):
+    """Pad a raw sheet row to the event layout and return it as a dict"""
+    row = list(row) + [""] * (len(EVENT_HEADERS) - len(row))
+    return dict(zip(EVENT_HEADERS, row))
+
+
+def events_on(sheet, date, full=False):
+    """``[date, type, name, phone]`` rows of ``Events`` dated ``date``, or whole event rows with ``full``.
+
+    Reads the date column, then only the rows spanning that date.
+    """
+    ws = sheet.worksheet(EVENTS_SHEET)
+    rows = [i for i, d in enumerate(ws.col_values(3)) if d == date]
+    if not rows:
+        return []
+    first, width, column = ("A", 6, 2) if full else ("C", 4, 0)
+    values = ws.get(f"{first}{rows[0] + 1}:F{rows[-1] + 1}")
+    return [[str(v).strip() for v in r[:width]] for r in values if len(r) >= width and r[column] == date]
+
+
+def attendance_row(event):
+    return [event["Date"], event["Type"], event["Name"], event["Phone"], "0000"]
+
+
+def guest_row(event):
+    return [event["Date"], event["Name"], "None", event["Phone"], "0000"]
+
+
+def cursor_rows(cursors):
+    """``Projector`` sheet rows for ``{view: last event row}``"""
+    return [list(VIEWS), [cursors[view] for view in VIEWS]]
+
+
+def parse_cursors(values):
+    """``{view: last event row}`` from the ``Projector`` sheet, including the single-cursor layout"""
+    header = values[0] if values else []
+    row = values[1] if len(values) > 1 else []
+    if header[:1] == [LEGACY_CURSOR]:
+        return dict.fromkeys(VIEWS, int(row[0]) if row and row[0] else 1)
+    cursors = dict(zip(header, row))
+    return {view: int(cursors.get(view) or 1) for view in VIEWS}
+
+
+class MatrixState:
+    """Header row and phone column of ``Attendance_Member``.
+
+    Only these two vectors are needed to place a cell, so the projector reads
+    them instead of the whole matrix before each write.
+    """
+
+    def __init__(self, headers, phones):
+        self.empty = not headers
+        self.headers = list(headers) or list(MATRIX_HEADERS)
+        self.columns = {h: i for i, h in enumerate(self.headers)}
+        # phones[0] is the header cell, so list index == sheet row - 1
+        self.rows = {p: i + 1 for i, p in enumerate(phones) if i > 0 and p}
+        self.row_count = max(len(phones), 1)
+
+    @classmethod
+    def read(cls, ws):
+        """Both vectors in one ``batch_get``"""
+        headers, phones = ws.batch_get(["1:1", "B:B"])
+        return cls(headers[0] if headers else [], [row[0] if row else "" for row in phones])
+
+    def plan(self, events):
+        """Return (new headers, cell updates, appended rows) for member events"""
+        new_headers = []
+        cells = {}
+        pending = {}
+        for event in events:
+            if event["Type"] != MEMBER:
+                continue
+            date, phone = event["Date"], event["Phone"]
+            if date not in self.columns:
+                self.columns[date] = len(self.headers)
+                self.headers.append(date)
+                new_headers.append(date)
+            col = self.columns[date]
+            if phone in self.rows:
+                cells[(self.rows[phone], col)] = 1
+            elif phone in pending:
+                pending[phone][col] = 1
+            else:
+                pending[phone] = {0: event["Name"], 1: phone, col: 1}
+
+        appended = []
+        for phone, values in pending.items():
+            self.row_count += 1
+            self.rows[phone] = self.row_count
+            row = [""] * len(self.headers)
+            for col, value in values.items():
+                row[col] = value
+            appended.append(row)
+        return new_headers, cells, appended
+
+
+class Projector:
+    """Incrementally applies new ``Events`` rows to the derived views.
+
+    With a shared ``cache``, replicas take turns through a lease so only one
+    projects at a time, and the cursors travel through the cache instead of
+    being re-read from the sheet by each replica. The matrix coordinates are
+    read before every matrix write, so rebuilds and hand edits of
+    ``Attendance_Member`` never send a mark to the wrong row.
+    """
+
+    def __init__(self, sheet, cache=None, cache_key="projector"):
+        self.sheet = sheet
+        self.cursors = None
+        self.cache = cache
+        self.cache_key = cache_key
+        self.state_version = 0
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{id(self)}"
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def acquire(self, ttl):
+        """Take or renew the projector lease; always True without a shared cache"""
+        return self.cache is None or self.cache.acquire(f"{self.cache_key}:lease", self.owner, ttl)
+
+    def release(self):
+        # A lease that expires now is free for the next replica
+        if self.cache is not None:
+            self.cache.acquire(f"{self.cache_key}:lease", self.owner, 0)
+
+    def _sync_from_cache(self):
+        state, version, _ = self.cache.get(self.cache_key)
+        if version and version != self.state_version:
+            self.cursors = state.get("cursors") or dict.fromkeys(VIEWS, state["cursor"])
+            self.state_version = version
+
+    def _publish(self):
+        self.state_version = self.cache.set(self.cache_key, {"cursors": self.cursors})
+
+    def _load_cursors(self):
+        return parse_cursors(self.sheet.worksheet(PROJECTOR_SHEET).get("A1:C2"))
+
+    def _save_cursors(self):
+        self.sheet.worksheet(PROJECTOR_SHEET).update("A1:C2", cursor_rows(self.cursors))
+
+    def run(self):
+        """Project events appended since the last run. Returns the number read.
+
+        A view whose write fails keeps its cursor and gets the same events
+        next run; the views that were written move on, so their appends are
+        never repeated.
+        """
+        with self.lock:
+            if self.cache is not None:
+                self._sync_from_cache()
+            if self.cursors is None:
+                self.cursors = self._load_cursors()
+            start = min(self.cursors.values())
+            raw = self.sheet.worksheet(EVENTS_SHEET).get(f"A{start + 1}:F")
+            events = [(row, parse_event(r)) for row, r in enumerate(raw, start + 1) if r and r[0]]
+            if not events:
+                return 0
+            end = start + len(raw)
+            writers = {"Attendance": self._write_attendance, "Guest": self._write_guests,
+                       "Attendance_Member": self._write_matrix}
+            views = [view for view in VIEWS if self.cursors[view] < end]
+            # The views are independent, so write them concurrently
+            results = sheets_io().gather(
+                *(lambda v=view: writers[v]([e for row, e in events if row > self.cursors[v]]) for view in views),
+                return_exceptions=True,
+            )
+            failed = None
+            for view, result in zip(views, results):
+                if isinstance(result, BaseException):
+                    failed = failed or result
+                else:
+                    self.cursors[view] = end
+            self._save_cursors()
+            if self.cache is not None:
+                self._publish()
+            if failed is not None:
+                raise failed
+            return len(events)
+
+    def _write_attendance(self, events):
+        if events:
+            self.sheet.worksheet("Attendance").append_rows([attendance_row(e) for e in events])
+
+    def _write_guests(self, events):
+        guests = [guest_row(e) for e in events if e["Type"] == GUEST]
+        if guests:
+            self.sheet.worksheet("Guest").append_rows(guests)
+
+    def _write_matrix(self, events):
+        from gspread.utils import rowcol_to_a1
+
+        if not any(e["Type"] == MEMBER for e in events):
+            return
+        matrix_ws = self.sheet.worksheet("Attendance_Member")
+        matrix = MatrixState.read(matrix_ws)
+        new_headers, cells, appended = matrix.plan(events)
+        updates = []
+        if new_headers:
+            start = len(matrix.headers) - len(new_headers) + 1
+            updates.append({"range": rowcol_to_a1(1, start), "values": [new_headers]})
+        if matrix.empty:
+            updates.append({"range": "A1:B1", "values": [MATRIX_HEADERS]})
+        for (row, col), value in cells.items():
+            updates.append({"range": rowcol_to_a1(row, col + 1), "values": [[value]]})
+        if updates:
+            matrix_ws.batch_update(updates)
+        if appended:
+            matrix_ws.append_rows(appended)
+
+    def start(self, interval=15, paused=None):
+        """Run the projector every ``interval`` seconds on a daemon thread.
+
+        Runs are skipped while ``paused()`` is true (Sheets degraded, see ``health``).
+        """
+        def loop():
+            while not self.stopped.wait(interval):
+                if paused is not None and paused():
+                    continue
+                if not self.acquire(interval * 3):
+                    continue
+                try:
+                    self.run()
+                except Exception:
+                    logger.exception("Projection failed; retrying in %ss", interval)
+
+        thread = threading.Thread(target=loop, name="event-projector", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self.stopped.set()
+
+    def rebuild(self):
+        """Regenerate every view from the full event log.
+
+        Holds the projector lease while it writes, so no replica projects into
+        views that are being replaced, and publishes the new cursors.
+        """
+        with self.lock:
+            if not self.acquire(LEASE_TTL):
+                raise RuntimeError("Another replica is projecting; try again in a minute")
+            try:
+                return self._rebuild()
+            finally:
+                self.release()
+
+    def _rebuild(self):
+        events_ws = self.sheet.worksheet(EVENTS_SHEET)
+        raw = events_ws.get("A2:F")
+        events = [parse_event(r) for r in raw if r and r[0]]
+
+        for name, build in (("Attendance", attendance_row), ("Guest", guest_row)):
+            ws = self.sheet.worksheet(name)
+            header = ws.row_values(1)
+            rows = [build(e) for e in events if name == "Attendance" or e["Type"] == GUEST]
+            ws.clear()
+            ws.update("A1", ([header] if header else []) + rows)
+
+        matrix = MatrixState(MATRIX_HEADERS, [""])
+        _, _, rows = matrix.plan(events)
+        width = len(matrix.headers)
+        matrix_ws = self.sheet.worksheet("Attendance_Member")
+        matrix_ws.clear()
+        matrix_ws.update("A1", [matrix.headers] + [r + [""] * (width - len(r)) for r in rows])
+
+        self.cursors = dict.fromkeys(VIEWS, len(raw) + 1)
+        self._save_cursors()
+        if self.cache is not None:
+            self._publish()
+        return len(events)
+
+
+def shared_projector(sheet, slug=None):
+    """A ``Projector`` on the app's shared cache, for command line tools that rewrite views.
+
+    Without ``shared_cache`` in the secrets there is no lease to take: stop
+    the app before rebuilding.
+    """
+    from sharedcache import open_cache
+    from sheets import load_secrets
+    from tenants import DEFAULT_CLUB
+
+    cache = open_cache(load_secrets().get("shared_cache"))
+    return Projector(sheet, cache, f"{slug or DEFAULT_CLUB}:projector")
+
+
+def ensure_worksheet(sheet, title, headers, rows=1000):
+    """``sheet.worksheet(title)``, adding it with ``headers`` first if it does not exist"""
+    from gspread.exceptions import WorksheetNotFound
+
+    try:
+        return sheet.worksheet(title)
+    except WorksheetNotFound:
+        ws = sheet.add_worksheet(title, rows=rows, cols=len(headers))
+        ws.update("A1", [headers])
+        logger.info("Added the %s worksheet", title)
+        return ws
+
+
+def migrate(sheet):
+    """Seed an empty ``Events`` sheet from the legacy ``Attendance`` rows.
+
+    Adds the ``Events`` and ``Projector`` worksheets when they are missing.
+    """
+    legacy = sheet.worksheet("Attendance").get_all_values()[1:]
+    events_ws = ensure_worksheet(sheet, EVENTS_SHEET, EVENT_HEADERS, rows=len(legacy) + 1000)
+    if len(events_ws.get("A2:A2")) > 0:
+        raise RuntimeError("Events sheet already has rows; refusing to migrate twice")
+    rows = []
+    for row in legacy:
+        row = list(row) + [""] * (4 - len(row))
+        date, kind, name, phone = row[:4]
+        if kind not in (MEMBER, GUEST):
+            continue
+        rows.append([uuid.uuid4().hex[:12], f"{date} 00:00:00", date, kind, name, str(phone)])
+    events_ws.update("A1", [EVENT_HEADERS] + rows)
+    projector_ws = ensure_worksheet(sheet, PROJECTOR_SHEET, list(VIEWS))
+    projector_ws.update("A1:C2", cursor_rows(dict.fromkeys(VIEWS, len(rows) + 1)))
+    return len(rows)
+
+
+def main(argv):
+    from sheets import open_spreadsheet
+
+    if len(argv) != 2 or argv[1] not in ("migrate", "project", "rebuild"):
+        print(__doc__)
+        return 2
+    sheet = open_spreadsheet()
+    if argv[1] == "migrate":
+        print(f"Migrated {migrate(sheet)} attendance rows into {EVENTS_SHEET}")
+    elif argv[1] == "project":
+        projector = shared_projector(sheet)
+        if not projector.acquire(LEASE_TTL):
+            print("Another replica is projecting; try again in a minute")
+            return 1
+        try:
+            print(f"Projected {projector.run()} new events")
+        finally:
+            projector.release()
+    else:
+        print(f"Rebuilt views from {shared_projector(sheet).rebuild()} events")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,84 @@
+"""Phone-keyed index of guests and their visits.
+
+Seeded once from the ``Guest`` worksheet and kept current from the check-in
+service, so repeat guests are recognised at the door without a sheet read
+and the follow-up list is always ready.
+"""
+import threading
+
+from sheets import CHUNK_ROWS, read_chunks
+
+GUEST_SHEET = "Guest"
+
+
+class GuestRecord:
+    __slots__ = ("name", "phone", "visits", "first_visit", "last_visit")
+
+    def __init__(self, name, phone, date):
+        self.name = name
+        self.phone = phone
+        self.visits = 0
+        self.first_visit = date
+        self.last_visit = date
+
+    def visit(self, name, date):
+        if date == self.last_visit and self.visits:
+            return False
+        self.visits += 1
+        self.name = name or self.name
+        self.first_visit = min(self.first_visit, date)
+        self.last_visit = max(self.last_visit, date)
+        return True
+
+    def as_dict(self):
+        return {
+            "Name": self.name,
+            "Phone": self.phone,
+            "Visits": self.visits,
+            "First Visit": self.first_visit,
+            "Last Visit": self.last_visit,
+        }
+
+
+class GuestIndex:
+    def __init__(self):
+        self.by_phone = {}
+        self.lock = threading.Lock()
+
+    def add(self, name, phone, date):
+        """Count a visit; a second check-in on the same date is not a new visit"""
+        phone = str(phone).strip()
+        with self.lock:
+            record = self.by_phone.get(phone)
+            if record is None:
+                record = self.by_phone[phone] = GuestRecord(name, phone, date)
+            record.visit(name, date)
+            return record
+
+    def get(self, phone):
+        return self.by_phone.get(str(phone).strip())
+
+    def on_event(self, event):
+        """``CheckinService`` listener"""
+        if event["type"] == "Guest":
+            self.add(event["name"], event["phone"], event["date"])
+
+    def seed_rows(self, rows):
+        for row in rows:
+            if len(row) >= 4 and row[3]:
+                self.add(row[1], row[3], row[0])
+
+    def seed(self, sheet, chunk=CHUNK_ROWS, archive_dir=None):
+        """Read existing ``Guest`` rows chunk by chunk, plus archived ones from ``archive_dir``"""
+        for rows in read_chunks(sheet, GUEST_SHEET, "D", chunk, archive_dir):
+            self.seed_rows(rows)
+
+    def follow_ups(self, member_phones):
+        """Guests who have not joined yet, most recent visit first"""
+        pending = [g for g in self.by_phone.values() if g.phone not in member_phones]
+        pending.sort(key=lambda g: (g.last_visit, g.visits), reverse=True)
+        return [g.as_dict() for g in pending]
+
+    def conversions(self, member_phones):
+        """Guests whose phone now appears in ``Members``"""
+        return [g.as_dict() for g in self.by_phone.values() if g.phone in member_phones]
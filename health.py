@@ -0,0 +1,148 @@
+"""Sheets health probe and the degraded-mode switch.
+
+A daemon thread times one tiny read every few seconds, and the write queue
+reports how its appends went. Over the last ``WINDOW`` samples, a median
+latency above ``SLOW_MS`` or an error rate above ``MAX_ERROR_RATE`` marks the
+spreadsheet degraded. While degraded, check-ins use the cached roster only
+and rows go to the local journal instead of Sheets; the app tells people
+their check-in is saved and syncing. After ``RECOVER`` healthy probes in a
+row it switches back and the queue drains.
+
+A missing worksheet, a bad spreadsheet name or a 4xx from the API is a
+configuration problem, not an outage: it is reported in ``status()`` and
+does not count towards the latency or error rate.
+"""
+import logging
+import statistics
+import threading
+import time
+from collections import deque
+
+PROBE_INTERVAL = 10
+WINDOW = 10
+SLOW_MS = 3000
+MAX_ERROR_RATE = 0.3
+RECOVER = 3
+MIN_SAMPLES = 3
+# Every club's spreadsheet has a Members sheet; one values call, no worksheet lookup
+PROBE_RANGE = "Members!A1"
+
+logger = logging.getLogger(__name__)
+
+
+def is_config_error(exc):
+    """True for errors that retrying will not fix: missing sheets, bad requests, no access"""
+    from gspread.exceptions import APIError, SpreadsheetNotFound, WorksheetNotFound
+
+    if isinstance(exc, (WorksheetNotFound, SpreadsheetNotFound)):
+        return True
+    if isinstance(exc, APIError):
+        # 408 and 429 are the API being slow or throttling us, which is what degraded mode is for
+        return 400 <= exc.code < 500 and exc.code not in (408, 429)
+    return False
+
+
+class SheetsHealth:
+    def __init__(self, sheet, interval=PROBE_INTERVAL, slow_ms=SLOW_MS, max_error_rate=MAX_ERROR_RATE):
+        self.sheet = sheet
+        self.interval = interval
+        self.slow_ms = slow_ms
+        self.max_error_rate = max_error_rate
+        self.samples = deque(maxlen=WINDOW)
+        self.streak = 0
+        self.degraded = False
+        self.config_error = None
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.probing = None
+
+    def record(self, ms, ok):
+        """Add one call's outcome and re-evaluate the mode"""
+        healthy = ok and ms <= self.slow_ms
+        with self.lock:
+            self.samples.append((ms, ok))
+            self.streak = self.streak + 1 if healthy else 0
+            if not self.degraded and not healthy and self._unhealthy():
+                self.degraded = True
+                logger.warning("Sheets degraded (%s); writing to the journal only", self.status())
+            elif self.degraded and self.streak >= RECOVER:
+                self.degraded = False
+                # Start the window afresh so the outage's samples don't flip it straight back
+                self.samples.clear()
+                logger.info("Sheets healthy again")
+
+    def record_error(self, ms, exc):
+        """Add a failed call: a config error is reported, anything else counts as a failure"""
+        if is_config_error(exc):
+            if self.config_error is None:
+                logger.error("Sheets configuration error: %s", exc)
+            message = str(exc)
+            # WorksheetNotFound's message is just the sheet name
+            self.config_error = message if message.startswith(type(exc).__name__) else f"{type(exc).__name__}: {message}"
+        else:
+            self.record(ms, False)
+
+    def _unhealthy(self):
+        if len(self.samples) < MIN_SAMPLES:
+            return False
+        errors = sum(1 for _, ok in self.samples if not ok)
+        return (errors / len(self.samples) > self.max_error_rate
+                or statistics.median(ms for ms, _ in self.samples) > self.slow_ms)
+
+    def probe(self):
+        """Time one tiny read on a thread of its own.
+
+        Not on the shared ``sheets_io`` pool: a hung read holds its thread
+        until the HTTP timeout, and during an outage hung probes would fill
+        the pool that every club's writes wait on.
+        """
+        if self.probing is not None and self.probing.is_alive():
+            # The last probe is still hanging, which counts as another failure
+            self.record(2 * self.slow_ms, False)
+            return
+        outcome = {}
+
+        def read():
+            try:
+                self.sheet.values_batch_get([PROBE_RANGE])
+                outcome["ok"] = True
+            except Exception as e:
+                outcome["error"] = e
+
+        start = time.perf_counter()
+        self.probing = threading.Thread(target=read, name="sheets-probe", daemon=True)
+        self.probing.start()
+        # Stop waiting at twice the threshold: a hung call is as bad as an error
+        self.probing.join(2 * self.slow_ms / 1000)
+        ms = (time.perf_counter() - start) * 1000
+        error = outcome.get("error")
+        if error is not None and is_config_error(error):
+            # The API answered, so it counts as reachable; the error itself is reported
+            self.record_error(ms, error)
+            self.record(ms, True)
+            return
+        if outcome.get("ok"):
+            self.config_error = None
+        self.record(ms, outcome.get("ok", False))
+
+    def status(self):
+        """``{"degraded", "config error", "p50 ms", "error rate", "samples"}`` for the admin view"""
+        samples = list(self.samples)
+        return {
+            "degraded": self.degraded,
+            "config error": self.config_error,
+            "p50 ms": round(statistics.median(ms for ms, _ in samples)) if samples else None,
+            "error rate": round(sum(1 for _, ok in samples if not ok) / len(samples), 2) if samples else None,
+            "samples": len(samples),
+        }
+
+    def start(self):
+        def loop():
+            while not self.stopped.wait(self.interval):
+                self.probe()
+
+        threading.Thread(target=loop, name="sheets-health", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
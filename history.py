@@ -0,0 +1,154 @@
+"""Packed bitset model of per-member attendance history.
+
+Each member keeps one ``bytearray`` where bit ``i`` is set when they attended
+meeting ``i``. Meeting indexes follow the chronological order of the dates,
+so a district's full history fits in a few MB and marking a meeting is a
+single byte update.
+
+Each club keeps one, seeded from the local snapshot at load or from
+``Attendance_Member`` the first time the admin view asks for it, and kept
+current from the check-in service. Rates and streaks come from
+``analytics`` over ``to_matrix()``.
+"""
+import sys
+import threading
+from bisect import bisect_left
+
+
+class MemberRecord:
+    """One member's attendance bitset"""
+
+    __slots__ = ("name", "phone", "bits")
+
+    def __init__(self, name, phone, nbytes=0):
+        self.name = name
+        self.phone = str(phone)
+        self.bits = bytearray(nbytes)
+
+    def mark(self, index):
+        byte = index >> 3
+        if byte >= len(self.bits):
+            self.bits.extend(bytes(byte - len(self.bits) + 1))
+        self.bits[byte] |= 1 << (index & 7)
+
+    def attended(self, index):
+        byte = index >> 3
+        return byte < len(self.bits) and bool(self.bits[byte] >> (index & 7) & 1)
+
+    def as_int(self):
+        return int.from_bytes(self.bits, "little")
+
+    def count(self):
+        """Number of meetings attended (popcount)"""
+        return self.as_int().bit_count()
+
+    def insert(self, index):
+        """Open an unattended meeting at ``index``, moving later meetings up one bit"""
+        x = self.as_int()
+        low = x & ((1 << index) - 1)
+        x = (x >> index << (index + 1)) | low
+        self.bits = bytearray(x.to_bytes(max(len(self.bits), (x.bit_length() + 7) >> 3), "little"))
+
+
+class AttendanceHistory:
+    """All members' bitsets plus the date <-> meeting index mapping"""
+
+    def __init__(self, dates=()):
+        self.dates = []
+        self.index = {}
+        self.members = {}
+        self.seeded = False
+        self.lock = threading.RLock()
+        for date in sorted(dates):
+            self.add_meeting(date)
+
+    def add_meeting(self, date):
+        """Return the index for ``date``; an older date than the latest is slotted in place"""
+        if date in self.index:
+            return self.index[date]
+        position = bisect_left(self.dates, date)
+        if position == len(self.dates):
+            self.dates.append(date)
+            self.index[date] = position
+            return position
+        # A back-dated meeting: shift every later index (rare, bulk corrections only)
+        for record in self.members.values():
+            record.insert(position)
+        self.dates.insert(position, date)
+        self.index = {d: i for i, d in enumerate(self.dates)}
+        return position
+
+    def member(self, name, phone):
+        phone = str(phone)
+        record = self.members.get(phone)
+        if record is None:
+            record = self.members[phone] = MemberRecord(name, phone, (len(self.dates) + 7) >> 3)
+        return record
+
+    def mark(self, name, phone, date):
+        with self.lock:
+            self.member(name, phone).mark(self.add_meeting(date))
+
+    def on_event(self, event):
+        """``CheckinService`` listener"""
+        if event["type"] == "Member":
+            self.mark(event["name"], event["phone"], event["date"])
+
+    def seed_matrix(self, matrix):
+        """Mark every presence in an ``analytics.AttendanceMatrix``"""
+        with self.lock:
+            for date in matrix.dates:
+                self.add_meeting(date)
+            # Indexes only after every date is in: a back-dated one shifts the later ones
+            indexes = [self.index[date] for date in matrix.dates]
+            for name, phone, row in zip(matrix.names, matrix.phones, matrix.present.tolist()):
+                record = self.member(name, phone)
+                for index, present in zip(indexes, row):
+                    if present:
+                        record.mark(index)
+
+    def seed(self, sheet):
+        """Read ``Attendance_Member`` once; check-ins since then arrive through ``on_event``"""
+        from analytics import AttendanceMatrix
+
+        self.seed_matrix(AttendanceMatrix.from_sheet(sheet))
+        self.seeded = True
+
+    def nbytes(self):
+        """Approximate resident size of the model"""
+        return sys.getsizeof(self.members) + sum(
+            sys.getsizeof(m) + sys.getsizeof(m.bits) for m in self.members.values()
+        )
+
+    @classmethod
+    def from_values(cls, values):
+        """Build from ``Attendance_Member`` values (header row first)"""
+        from analytics import AttendanceMatrix
+
+        history = cls()
+        history.seed_matrix(AttendanceMatrix.from_values(values))
+        return history
+
+    def to_array(self):
+        """Unpack into the boolean members x dates array used by ``analytics``"""
+        import numpy as np
+
+        with self.lock:
+            members = list(self.members.values())
+            width = (len(self.dates) + 7) >> 3
+            packed = np.zeros((len(members), width), dtype=np.uint8)
+            for i, m in enumerate(members):
+                bits = bytes(m.bits[:width])
+                packed[i, :len(bits)] = np.frombuffer(bits, dtype=np.uint8)
+        bits = np.unpackbits(packed, axis=1, bitorder="little")
+        return bits[:, :len(self.dates)].astype(bool)
+
+    def to_matrix(self):
+        """An ``analytics.AttendanceMatrix`` for rates, streaks and at-risk lists"""
+        from analytics import AttendanceMatrix
+
+        with self.lock:
+            members = list(self.members.values())
+            dates = list(self.dates)
+            present = self.to_array()
+        return AttendanceMatrix([m.name for m in members], [m.phone for m in members], dates, present)
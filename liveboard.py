@@ -0,0 +1,109 @@
+"""Live attendance board fed by the check-in write path.
+
+``CheckinService`` calls ``LiveBoard.apply`` for every check-in and rating it
+records. The board keeps running totals for the current meeting date and a
+numbered list of deltas, so viewers ask for "everything after version N"
+instead of re-reading ``Attendance``. When a club loads, ``seed`` starts the
+board from today's ``Events`` rows and ratings.
+"""
+import threading
+from collections import deque
+
+
+class LiveBoard:
+    """Running totals and an ordered delta log for one meeting date"""
+
+    def __init__(self, max_deltas=2000, today=None):
+        # ``today()`` gives the meeting date as YYYY-MM-DD; older events are corrections
+        self.today = today
+        self.cond = threading.Condition()
+        self.deltas = deque(maxlen=max_deltas)
+        self.version = 0
+        self.reset(None)
+
+    def reset(self, date):
+        self.date = date
+        self.attendees = []
+        self.members = 0
+        self.guests = 0
+        self.rating_sum = 0
+        self.rating_count = 0
+
+    def totals(self):
+        return {
+            "date": self.date,
+            "members": self.members,
+            "guests": self.guests,
+            "ratings": self.rating_count,
+            "average_rating": round(self.rating_sum / self.rating_count, 2) if self.rating_count else None,
+        }
+
+    def seed(self, date, events, ratings=None):
+        """Start the board for ``date`` from check-ins already recorded.
+
+        ``events`` are check-in events as passed to ``apply``; ``ratings``
+        has the ``count`` and ``total`` of the ratings so far. Viewers get it
+        as one snapshot rather than a delta per attendee.
+        """
+        with self.cond:
+            self.reset(date)
+            self.deltas.clear()
+            for event in sorted(events, key=lambda e: e["time"]):
+                if event["date"] != date:
+                    continue
+                self.attendees.append({"time": event["time"], "type": event["type"], "name": event["name"]})
+                if event["type"] == "Member":
+                    self.members += 1
+                else:
+                    self.guests += 1
+            if ratings is not None:
+                self.rating_sum, self.rating_count = ratings.total, ratings.count
+            self.version += 1
+            self.cond.notify_all()
+
+    def apply(self, event):
+        """Fold one check-in or rating event (see ``CheckinService.notify``)"""
+        with self.cond:
+            current = self.today() if self.today else self.date
+            if current and event["date"] < current:
+                # Back-dated corrections don't belong on tonight's board
+                return
+            if event["date"] != self.date:
+                self.reset(event["date"])
+                self.deltas.clear()
+            delta = {"type": event["type"]}
+            if event["type"] == "Rating":
+                self.rating_sum += event["rating"]
+                self.rating_count += 1
+            else:
+                attendee = {"time": event["time"], "type": event["type"], "name": event["name"]}
+                self.attendees.append(attendee)
+                if event["type"] == "Member":
+                    self.members += 1
+                else:
+                    self.guests += 1
+                delta["attendee"] = attendee
+            self.version += 1
+            delta["version"] = self.version
+            delta["totals"] = self.totals()
+            self.deltas.append(delta)
+            self.cond.notify_all()
+
+    def since(self, version):
+        """Deltas after ``version``, or None if the caller fell too far behind"""
+        with self.cond:
+            oldest = self.deltas[0]["version"] if self.deltas else self.version + 1
+            if version < oldest - 1:
+                return None
+            return [d for d in self.deltas if d["version"] > version]
+
+    def wait(self, version, timeout=15):
+        """Block until something newer than ``version`` arrives; returns the deltas"""
+        with self.cond:
+            self.cond.wait_for(lambda: self.version > version, timeout)
+        return self.since(version)
+
+    def snapshot(self):
+        """Full state for a viewer that is just starting or had to resync"""
+        with self.cond:
+            return {"version": self.version, "attendees": list(self.attendees), "totals": self.totals()}
@@ -0,0 +1,124 @@
+"""Opt-in sampling profiler for Streamlit script runs.
+
+Start the app with ``APP_PROFILE_DIR=profiles streamlit run app.py`` and
+every run of ``app.py`` is sampled from a background thread every few
+milliseconds, tagged with ``st.session_state.step``. Samples are kept in
+the collapsed-stack format (``frame;frame;frame count``) that
+``flamegraph.pl``, speedscope and inferno read directly::
+
+    profiles/member_login.folded     # one file per step, merged across runs
+    profiles/runs.jsonl              # one line per run: step, ms, samples
+
+The run ends when the script's frame leaves the stack, so ``st.rerun()``,
+``st.stop()`` and exceptions are all measured. Without the variable nothing
+is sampled.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+PROFILE_ENV = "APP_PROFILE_DIR"
+INTERVAL = 0.005
+
+_lock = threading.Lock()
+
+
+def profile_dir():
+    return os.environ.get(PROFILE_ENV)
+
+
+def frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class RunSampler(threading.Thread):
+    """Samples one script thread until its ``script`` frame is gone"""
+
+    def __init__(self, directory, step, script, interval=INTERVAL):
+        super().__init__(daemon=True, name=f"profile-{step}")
+        self.directory = directory
+        self.step = step
+        self.script = os.path.abspath(script)
+        self.interval = interval
+        self.target = threading.get_ident()
+        self.stacks = Counter()
+        self.started = time.perf_counter()
+
+    def stack(self):
+        """Folded stack from the script's module frame down, or None once the run is over"""
+        frame = sys._current_frames().get(self.target)
+        labels = []
+        while frame is not None:
+            code = frame.f_code
+            labels.append(frame_label(code))
+            if code.co_name == "<module>" and os.path.abspath(code.co_filename) == self.script:
+                return ";".join(reversed(labels))
+            frame = frame.f_back
+        return None
+
+    def run(self):
+        while True:
+            stack = self.stack()
+            if stack is None:
+                break
+            self.stacks[stack] += 1
+            time.sleep(self.interval)
+        save_run(self.directory, self.step, (time.perf_counter() - self.started) * 1000, self.stacks)
+
+
+def start_run(step, script):
+    """Sample the calling script run if profiling is enabled"""
+    directory = profile_dir()
+    if not directory:
+        return None
+    sampler = RunSampler(directory, str(step), script)
+    sampler.start()
+    return sampler
+
+
+def read_folded(path):
+    stacks = Counter()
+    try:
+        with open(path) as f:
+            for line in f:
+                stack, _, count = line.rstrip("\n").rpartition(" ")
+                if stack:
+                    stacks[stack] += int(count)
+    except FileNotFoundError:
+        pass
+    return stacks
+
+
+def save_run(directory, step, ms, stacks):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{step}.folded")
+    with _lock:
+        merged = read_folded(path)
+        merged.update(stacks)
+        with open(path + ".tmp", "w") as f:
+            f.writelines(f"{stack} {count}\n" for stack, count in merged.most_common())
+        os.replace(path + ".tmp", path)
+        with open(os.path.join(directory, "runs.jsonl"), "a") as f:
+            f.write(json.dumps({"at": time.time(), "step": step, "ms": round(ms, 1),
+                                "samples": sum(stacks.values())}) + "\n")
+
+
+def slowest(directory, n=10):
+    """Steps ordered by their slowest run: ``[{"Step", "Runs", "Mean ms", "Max ms"}]``"""
+    runs = defaultdict(list)
+    try:
+        with open(os.path.join(directory, "runs.jsonl")) as f:
+            for line in f:
+                run = json.loads(line)
+                runs[run["step"]].append(run["ms"])
+    except FileNotFoundError:
+        return []
+    rows = [
+        {"Step": step, "Runs": len(ms), "Mean ms": round(sum(ms) / len(ms), 1), "Max ms": max(ms)}
+        for step, ms in runs.items()
+    ]
+    rows.sort(key=lambda r: r["Max ms"], reverse=True)
+    return rows[:n]
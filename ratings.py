@@ -0,0 +1,79 @@
+"""Per-meeting rating aggregates, updated in O(1) as ratings arrive.
+
+Seeded once from the ``rating`` worksheet in fixed-size row chunks, then kept
+current by subscribing to the check-in service, so the admin view and the
+meeting report never need to re-read the sheet.
+"""
+import threading
+
+from sheets import CHUNK_ROWS, read_chunks
+
+RATING_SHEET = "rating"
+
+
+class MeetingRatings:
+    """Count, sum and 1-5 histogram for one meeting date"""
+
+    __slots__ = ("count", "total", "histogram")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.histogram = [0, 0, 0, 0, 0]
+
+    def add(self, rating):
+        self.count += 1
+        self.total += rating
+        self.histogram[rating - 1] += 1
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "mean": round(self.mean, 2) if self.count else None,
+            "histogram": {score: self.histogram[score - 1] for score in range(1, 6)},
+        }
+
+
+class RatingAggregator:
+    def __init__(self):
+        self.meetings = {}
+        self.lock = threading.Lock()
+
+    def add(self, date, rating):
+        try:
+            rating = int(rating)
+        except (TypeError, ValueError):
+            return
+        if not 1 <= rating <= 5:
+            return
+        with self.lock:
+            meeting = self.meetings.get(date)
+            if meeting is None:
+                meeting = self.meetings[date] = MeetingRatings()
+            meeting.add(rating)
+
+    def on_event(self, event):
+        """``CheckinService`` listener"""
+        if event["type"] == "Rating":
+            self.add(event["date"], event["rating"])
+
+    def seed_rows(self, rows):
+        for row in rows:
+            if len(row) >= 3:
+                self.add(row[0], row[2])
+
+    def seed(self, sheet, chunk=CHUNK_ROWS, archive_dir=None):
+        """Read existing ratings chunk by chunk, plus archived ones from ``archive_dir``"""
+        for rows in read_chunks(sheet, RATING_SHEET, "C", chunk, archive_dir):
+            self.seed_rows(rows)
+
+    def get(self, date):
+        meeting = self.meetings.get(date)
+        return meeting.as_dict() if meeting else MeetingRatings().as_dict()
+
+    def dates(self):
+        return sorted(self.meetings, reverse=True)
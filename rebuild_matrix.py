@@ -0,0 +1,150 @@
+"""Regenerate ``Attendance_Member`` from the flat ``Attendance`` log.
+
+Reads ``Attendance`` once, pivots the member rows by (phone, date) with NumPy
+and prints what would change in the current matrix. With ``--apply`` the
+diff is printed first and, once confirmed (or with ``--yes``), the whole
+matrix is written back in a single update while holding the projector lease.
+
+Usage::
+
+    python rebuild_matrix.py           # dry run, show the diff
+    python rebuild_matrix.py --apply [--yes] [--archive DIR]
+
+Rows moved out by ``archive.py`` are merged back from ``DIR`` (default
+``archive``) so archived meetings stay in the matrix.
+"""
+import sys
+
+import numpy as np
+
+from analytics import AttendanceMatrix
+from archive import DEFAULT_DIR, merged_values
+from eventlog import LEASE_TTL, Projector
+
+ATTENDANCE_SHEET = "Attendance"
+MATRIX_SHEET = "Attendance_Member"
+
+
+def pivot(attendance_values, current_phones=()):
+    """Build an ``AttendanceMatrix`` from ``Attendance`` rows (header first).
+
+    Members already in the sheet keep their row order; members only found in
+    the log follow in order of first appearance.
+    """
+    rows = [r for r in attendance_values[1:] if len(r) >= 4 and r[1] == "Member" and r[3]]
+    if not rows:
+        return AttendanceMatrix([], [], [], np.zeros((0, 0), dtype=bool))
+    log = np.array([r[:4] for r in rows], dtype=object)
+    dates, names, phones = log[:, 0].astype(str), log[:, 2], log[:, 3].astype(str)
+
+    unique_phones, first_seen, phone_idx = np.unique(phones, return_index=True, return_inverse=True)
+    unique_dates, date_idx = np.unique(dates, return_inverse=True)
+    present = np.zeros((len(unique_phones), len(unique_dates)), dtype=bool)
+    present[phone_idx, date_idx] = True
+
+    # Latest name seen for each phone
+    last_seen = len(phones) - 1 - np.unique(phones[::-1], return_index=True)[1]
+
+    rank = {p: i for i, p in enumerate(current_phones)}
+    order = sorted(range(len(unique_phones)), key=lambda i: (rank.get(unique_phones[i], len(rank)), first_seen[i]))
+    return AttendanceMatrix(
+        [names[last_seen[i]] for i in order],
+        [str(unique_phones[i]) for i in order],
+        [str(d) for d in unique_dates],
+        present[order],
+    )
+
+
+def pairs(matrix):
+    rows, cols = np.nonzero(matrix.present)
+    return {(matrix.phones[r], matrix.dates[c]) for r, c in zip(rows, cols)}
+
+
+def diff(current, rebuilt):
+    """Summarize how ``rebuilt`` differs from ``current``"""
+    before, after = pairs(current), pairs(rebuilt)
+    old_phones, new_phones, old_dates = set(current.phones), set(rebuilt.phones), set(current.dates)
+    return {
+        "added": sorted(after - before),
+        "removed": sorted(before - after),
+        "new_members": [p for p in rebuilt.phones if p not in old_phones],
+        "dropped_members": [p for p in current.phones if p not in new_phones],
+        "new_dates": [d for d in rebuilt.dates if d not in old_dates],
+    }
+
+
+def to_values(matrix, shape=(0, 0)):
+    """Sheet rows for ``matrix``, padded to ``shape`` so stale cells are blanked"""
+    header = ["Name", "Phone"] + list(matrix.dates)
+    values = [header] + [
+        [n, p] + [1 if x else "" for x in row]
+        for n, p, row in zip(matrix.names, matrix.phones, matrix.present.tolist())
+    ]
+    height, width = max(shape[0], len(values)), max(shape[1], len(header))
+    return [row + [""] * (width - len(row)) for row in values] + [[""] * width] * (height - len(values))
+
+
+def plan(sheet, archive_dir=DEFAULT_DIR):
+    """Return ``(changes, values)``: the diff and the rows that would replace the matrix"""
+    attendance = merged_values(sheet, ATTENDANCE_SHEET, archive_dir)
+    current_values = sheet.worksheet(MATRIX_SHEET).get_all_values()
+    current = AttendanceMatrix.from_values(current_values)
+    rebuilt = pivot(attendance, current.phones)
+    shape = (len(current_values), max((len(r) for r in current_values), default=0))
+    return diff(current, rebuilt), to_values(rebuilt, shape)
+
+
+def rebuild(sheet, apply=False, archive_dir=DEFAULT_DIR, confirm=None, projector=None):
+    """Diff the matrix against the log and, with ``apply``, write the rebuilt one.
+
+    ``confirm(changes)`` sees the diff before anything is written and can
+    refuse it. The write holds the projector lease and is refused if the
+    sheets changed after the diff was taken. Returns ``(changes, applied)``.
+    """
+    changes, values = plan(sheet, archive_dir)
+    if not apply or (confirm is not None and not confirm(changes)):
+        return changes, False
+    projector = projector or Projector(sheet)
+    if not projector.acquire(LEASE_TTL):
+        raise RuntimeError("Another replica is projecting; try again in a minute")
+    try:
+        if plan(sheet, archive_dir)[1] != values:
+            raise RuntimeError(f"{MATRIX_SHEET} or {ATTENDANCE_SHEET} changed after the diff; run again")
+        sheet.worksheet(MATRIX_SHEET).update("A1", values)
+    finally:
+        projector.release()
+    return changes, True
+
+
+def print_changes(changes):
+    for key, items in changes.items():
+        print(f"{key}: {len(items)}")
+        for item in items[:20]:
+            print(f"  {item}")
+        if len(items) > 20:
+            print(f"  ... {len(items) - 20} more")
+
+
+def main(argv):
+    from eventlog import shared_projector
+    from sheets import open_spreadsheet
+
+    apply = "--apply" in argv
+    archive_dir = argv[argv.index("--archive") + 1] if "--archive" in argv else DEFAULT_DIR
+
+    def confirm(changes):
+        print_changes(changes)
+        return "--yes" in argv or input(f"Write these changes to {MATRIX_SHEET}? [y/N] ").strip().lower() == "y"
+
+    sheet = open_spreadsheet()
+    changes, applied = rebuild(sheet, apply, archive_dir, confirm, shared_projector(sheet) if apply else None)
+    if not apply:
+        print_changes(changes)
+        print("Dry run; pass --apply to write the matrix.")
+    else:
+        print("Applied." if applied else "Not applied.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
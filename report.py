@@ -0,0 +1,155 @@
+"""Per-meeting attendance report: members present, guests, first-timers and ratings.
+
+Ratings and guest history come from the club's in-memory aggregates. Who
+attended a date is read once from ``Events`` (the date column, then only
+the rows spanning that date) and kept current from the check-in service,
+so each new check-in or rating bumps that date's version. A rendered
+report is cached per date and only rebuilt when its version moves.
+
+    python report.py 2025-06-10 [--out report.md] [--snapshot DIR]
+"""
+import sys
+import threading
+
+from eventlog import EVENTS_SHEET, GUEST, MEMBER, events_on
+
+
+class MeetingAttendance:
+    __slots__ = ("members", "guests", "version", "loaded")
+
+    def __init__(self):
+        self.members = {}
+        self.guests = {}
+        self.version = 0
+        self.loaded = False
+
+
+class MeetingReports:
+    def __init__(self, sheet, ratings, guests):
+        self.sheet = sheet
+        self.ratings = ratings
+        self.guests = guests
+        self.meetings = {}
+        self.rendered = {}
+        self.event_dates = None
+        self.lock = threading.Lock()
+
+    def _meeting(self, date):
+        meeting = self.meetings.get(date)
+        if meeting is None:
+            meeting = self.meetings[date] = MeetingAttendance()
+        return meeting
+
+    def _add(self, date, kind, name, phone):
+        meeting = self._meeting(date)
+        people = meeting.members if kind == MEMBER else meeting.guests
+        if phone not in people:
+            people[phone] = name
+            meeting.version += 1
+
+    def on_event(self, event):
+        """``CheckinService`` listener; subscribe it before the service starts"""
+        with self.lock:
+            if event["type"] == "Rating":
+                self._meeting(event["date"]).version += 1
+            else:
+                self._add(event["date"], event["type"], event["name"], event["phone"])
+
+    def load(self, date):
+        """Merge ``date``'s check-ins from ``Events`` into the ones seen in memory, once.
+
+        Check-ins recorded by this process are already here, even those still
+        in the write queue; the read adds the ones from before it started.
+        """
+        with self.lock:
+            meeting = self._meeting(date)
+            if meeting.loaded:
+                return meeting
+        values = events_on(self.sheet, date)
+        with self.lock:
+            for _, kind, name, phone in values:
+                if kind in (MEMBER, GUEST):
+                    self._add(date, kind, name, phone)
+            meeting.loaded = True
+            meeting.version += 1
+        return meeting
+
+    def dates(self):
+        """Every meeting date with check-ins or ratings, newest first.
+
+        The ``Events`` date column is read once; later check-ins arrive through ``on_event``.
+        """
+        if self.event_dates is None:
+            column = self.sheet.worksheet(EVENTS_SHEET).col_values(3)[1:]
+            self.event_dates = {d for d in column if d}
+        with self.lock:
+            dates = self.event_dates | {d for d, m in self.meetings.items() if m.members or m.guests}
+        return sorted(dates | set(self.ratings.dates()), reverse=True)
+
+    def report(self, date):
+        """Markdown report for ``date``; cached until a new row for that date arrives"""
+        meeting = self.load(date)
+        cached = self.rendered.get(date)
+        version = meeting.version
+        if cached and cached[0] == version:
+            return cached[1]
+        text = self.render(date, meeting)
+        self.rendered[date] = (version, text)
+        return text
+
+    def render(self, date, meeting):
+        with self.lock:
+            members = sorted(meeting.members.values(), key=str.lower)
+            guests = sorted(meeting.guests.items(), key=lambda g: g[1].lower())
+        first_timers = {phone for phone, _ in guests if (g := self.guests.get(phone)) and g.first_visit == date}
+        scores = self.ratings.get(date)
+
+        lines = [f"# Meeting Report: {date}", ""]
+        lines.append(f"- Members present: **{len(members)}**")
+        lines.append(f"- Guests: **{len(guests)}** ({len(first_timers)} first-time)")
+        if scores["count"]:
+            lines.append(f"- Average rating: **{scores['mean']}** from {scores['count']} ratings")
+            lines.append("- Ratings: " + ", ".join(f"{k}★ {v}" for k, v in scores["histogram"].items()))
+        else:
+            lines.append("- Average rating: no ratings")
+        lines += ["", "## Members", ""] + [f"- {name}" for name in members]
+        lines += ["", "## Guests", ""]
+        for phone, name in guests:
+            record = self.guests.get(phone)
+            visits = record.visits if record else 1
+            note = "first visit" if phone in first_timers else f"returning, {visits} visits in all"
+            lines.append(f"- {name} ({phone}, {note})")
+        return "\n".join(lines) + "\n"
+
+
+def main(argv):
+    from guests import GuestIndex
+    from ratings import RatingAggregator
+    from sheets import open_spreadsheet
+
+    args = [a for a in argv[1:] if not a.startswith("--")]
+    if not args:
+        print(__doc__)
+        return 2
+    sheet = open_spreadsheet()
+    ratings, guests = RatingAggregator(), GuestIndex()
+    if "--snapshot" in argv:
+        # Rating and guest history from local files; only the meeting's Events rows come from Sheets
+        from snapshot import load_snapshot, to_values
+        tables = load_snapshot(argv[argv.index("--snapshot") + 1], names=["rating", "Guest"])
+        ratings.seed_rows(to_values(tables["rating"])[1:] if "rating" in tables else [])
+        guests.seed_rows(to_values(tables["Guest"])[1:] if "Guest" in tables else [])
+    else:
+        ratings.seed(sheet)
+        guests.seed(sheet)
+    text = MeetingReports(sheet, ratings, guests).report(args[0])
+    if "--out" in argv:
+        with open(argv[argv.index("--out") + 1], "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
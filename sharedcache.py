@@ -0,0 +1,128 @@
+"""Versioned key/value cache shared between app replicas.
+
+Several ``streamlit run app.py`` workers on one host can point at the same
+SQLite file, so one of them reads the roster and the others reuse it.
+Every ``set`` bumps the key's version; readers compare versions to tell
+whether their local copy is stale.
+
+A networked store (Redis and the like) only needs the four methods of
+``SharedCache``: ``get``, ``set``, ``version`` and ``acquire``.
+
+Configure with ``shared_cache = "sqlite:///path/to/cache.db"`` in secrets.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class SharedCache:
+    """Interface. Values must be JSON-serializable."""
+
+    def get(self, key):
+        """Return ``(value, version, updated_at)``; ``(None, 0, 0.0)`` if missing"""
+        raise NotImplementedError
+
+    def set(self, key, value):
+        """Store ``value`` and return the new version"""
+        raise NotImplementedError
+
+    def version(self, key):
+        return self.get(key)[1]
+
+    def acquire(self, key, owner, ttl):
+        """Take or renew a lease on ``key`` for ``ttl`` seconds. True if ``owner`` holds it."""
+        raise NotImplementedError
+
+
+class LocalCache(SharedCache):
+    """In-process fallback when no shared store is configured"""
+
+    def __init__(self):
+        self.entries = {}
+        self.leases = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        return self.entries.get(key, (None, 0, 0.0))
+
+    def set(self, key, value):
+        with self.lock:
+            version = self.entries.get(key, (None, 0, 0.0))[1] + 1
+            self.entries[key] = (value, version, time.time())
+            return version
+
+    def acquire(self, key, owner, ttl):
+        now = time.time()
+        with self.lock:
+            holder, expires = self.leases.get(key, (None, 0.0))
+            if holder not in (None, owner) and expires > now:
+                return False
+            self.leases[key] = (owner, now + ttl)
+            return True
+
+
+class SQLiteCache(SharedCache):
+    """Shared cache in a SQLite file (WAL mode), safe across processes"""
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self.connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " key TEXT PRIMARY KEY, value TEXT, version INTEGER NOT NULL, updated REAL NOT NULL)"
+            )
+            db.execute("CREATE TABLE IF NOT EXISTS lease (key TEXT PRIMARY KEY, owner TEXT, expires REAL)")
+
+    def connect(self):
+        # sqlite3 connections belong to the thread that opened them
+        db = getattr(self.local, "db", None)
+        if db is None:
+            db = self.local.db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute("PRAGMA busy_timeout=5000")
+        return db
+
+    def get(self, key):
+        row = self.connect().execute("SELECT value, version, updated FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None, 0, 0.0
+        return json.loads(row[0]), row[1], row[2]
+
+    def set(self, key, value):
+        row = self.connect().execute(
+            "INSERT INTO cache (key, value, version, updated) VALUES (?, ?, 1, ?)"
+            " ON CONFLICT(key) DO UPDATE SET value = excluded.value, version = version + 1, updated = excluded.updated"
+            " RETURNING version",
+            (key, json.dumps(value), time.time()),
+        ).fetchone()
+        return row[0]
+
+    def version(self, key):
+        row = self.connect().execute("SELECT version FROM cache WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def acquire(self, key, owner, ttl):
+        now = time.time()
+        row = self.connect().execute(
+            "INSERT INTO lease (key, owner, expires) VALUES (?, ?, ?)"
+            " ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, expires = excluded.expires"
+            " WHERE lease.owner = excluded.owner OR lease.expires < ?"
+            " RETURNING owner",
+            (key, owner, now + ttl, now),
+        ).fetchone()
+        return row is not None
+
+
+def open_cache(url):
+    """``sqlite:///path`` -> ``SQLiteCache``; empty -> ``LocalCache``"""
+    if not url:
+        return LocalCache()
+    if url.startswith("sqlite:///"):
+        return SQLiteCache(url[len("sqlite:///"):])
+    raise ValueError(f"Unsupported shared cache URL: {url}")
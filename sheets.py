@@ -0,0 +1,221 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import tomllib
+from datetime import datetime, timedelta
+from functools import cache
+
+# gspread, google-auth and requests are imported on first use: they are most
+# of the app's cold-start cost and the page shell does not need them
+
+# Google Sheets Auth
+SCOPE = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive"
+]
+
+SPREADSHEET_NAME = "Toastmasters Attendance"
+CHUNK_ROWS = 5000
+SECRETS_PATH = ".streamlit/secrets.toml"
+
+# Access token shared across restarts and replicas on the same volume
+TOKEN_CACHE = ".streamlit/token_cache.json"
+REFRESH_MARGIN = timedelta(minutes=5)
+
+logger = logging.getLogger(__name__)
+
+# Transport settings, overridable with an [http] table in the secrets
+HTTP_DEFAULTS = {
+    "pool_size": 20,         # connections kept alive per host
+    "pool_block": False,     # wait for a free connection instead of opening a throwaway one
+    "connect_timeout": 5,
+    "read_timeout": 30,
+    "retries": 2,            # connection-level retries only; API errors are not retried here
+    "per_thread": False,     # give each thread its own session and pool
+}
+
+
+def load_secrets(path=SECRETS_PATH):
+    """Read the Streamlit secrets file for tools that run outside ``streamlit run``"""
+    with open(path, "rb") as f:
+        return tomllib.load(f)
+
+
+def http_config(overrides=None):
+    return {**HTTP_DEFAULTS, **dict(overrides or {})}
+
+
+def configure_session(session, config):
+    """Mount a keep-alive connection pool sized for concurrent Streamlit sessions"""
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(total=config["retries"], connect=config["retries"], read=0, status=0,
+                  allowed_methods=None, raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=config["pool_size"],
+                          pool_block=config["pool_block"], max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Connection"] = "keep-alive"
+    return session
+
+
+@cache
+def per_thread_session_class():
+    from google.auth.transport.requests import AuthorizedSession
+
+    class PerThreadSession(AuthorizedSession):
+        """One ``AuthorizedSession`` per thread behind a single session object.
+
+        gspread only sees this object, but each thread gets its own connection
+        pool, so threads never wait on each other's connections.
+        """
+
+        def __init__(self, credentials, config):
+            super().__init__(credentials)
+            self.config = config
+            self.local = threading.local()
+
+        def request(self, *args, **kwargs):
+            session = getattr(self.local, "session", None)
+            if session is None:
+                session = self.local.session = configure_session(AuthorizedSession(self.credentials), self.config)
+            return session.request(*args, **kwargs)
+
+    return PerThreadSession
+
+
+def make_session(credentials, config):
+    from google.auth.transport.requests import AuthorizedSession
+
+    if config["per_thread"]:
+        return per_thread_session_class()(credentials, config)
+    return configure_session(AuthorizedSession(credentials), config)
+
+
+def token_key(creds):
+    """Cache key: the service account and scopes the token was minted for"""
+    return hashlib.sha256(f"{creds.service_account_email}|{' '.join(sorted(creds.scopes or ()))}".encode()).hexdigest()
+
+
+def load_cached_token(creds, path):
+    """Put a still-valid cached token on ``creds``. Returns True on a hit."""
+    try:
+        with open(path) as f:
+            entry = json.load(f).get(token_key(creds))
+    except (OSError, ValueError):
+        return False
+    if not entry:
+        return False
+    expiry = datetime.fromisoformat(entry["expiry"])
+    if expiry - REFRESH_MARGIN <= datetime.utcnow():
+        return False
+    creds.token, creds.expiry = entry["token"], expiry
+    return True
+
+
+def save_token(creds, path):
+    """Write the token atomically to a file only this user can read"""
+    try:
+        with open(path) as f:
+            entries = json.load(f)
+    except (OSError, ValueError):
+        entries = {}
+    entries[token_key(creds)] = {"token": creds.token, "expiry": creds.expiry.isoformat()}
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".token-")
+    try:
+        os.fchmod(fd, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(entries, f)
+        os.replace(tmp, path)
+    except Exception:
+        os.unlink(tmp)
+        raise
+
+
+def refresh_token(creds, path):
+    from google.auth.transport.requests import Request
+
+    creds.refresh(Request())
+    if path:
+        save_token(creds, path)
+
+
+def start_token_refresher(creds, path):
+    """Refresh the token ``REFRESH_MARGIN`` before it expires, on a daemon thread.
+
+    Check-ins then never wait on the OAuth round trip, and other replicas
+    sharing ``path`` pick up the fresh token when they start.
+    """
+    stop = threading.Event()
+
+    def loop():
+        while True:
+            wait = (creds.expiry - REFRESH_MARGIN - datetime.utcnow()).total_seconds() if creds.expiry else 0
+            if stop.wait(max(wait, 1)):
+                return
+            try:
+                # Another replica may already have refreshed it
+                if not (path and load_cached_token(creds, path)):
+                    refresh_token(creds, path)
+            except Exception:
+                logger.exception("Token refresh failed; retrying in 30s")
+                if stop.wait(30):
+                    return
+
+    threading.Thread(target=loop, name="token-refresher", daemon=True).start()
+    return stop
+
+
+def authorize(service_account=None, http=None, token_cache=TOKEN_CACHE):
+    """Build a gspread client; one client (and its HTTP session) can open many spreadsheets.
+
+    ``service_account`` defaults to the block in ``.streamlit/secrets.toml`` so
+    command line tools can run outside ``streamlit run``. ``http`` overrides
+    ``HTTP_DEFAULTS``. The access token is cached in ``token_cache`` (pass
+    ``""`` to disable) and refreshed in the background.
+    """
+    import gspread
+    from google.oauth2.service_account import Credentials
+
+    if service_account is None:
+        service_account = load_secrets()["google_service_account"]
+    config = http_config(http)
+    creds = Credentials.from_service_account_info(dict(service_account), scopes=SCOPE)
+    if not (token_cache and load_cached_token(creds, token_cache)):
+        refresh_token(creds, token_cache)
+    start_token_refresher(creds, token_cache)
+    client = gspread.authorize(creds, session=make_session(creds, config))
+    client.http_client.auth = creds
+    client.set_timeout((config["connect_timeout"], config["read_timeout"]))
+    return client
+
+
+def open_spreadsheet(service_account=None, name=SPREADSHEET_NAME):
+    """Authorize with the service account and open the attendance spreadsheet"""
+    return authorize(service_account).open(name)
+
+
+def read_chunks(sheet, name, last_column, chunk=CHUNK_ROWS, archive_dir=None):
+    """Yield the data rows of worksheet ``name`` (columns A to ``last_column``) a chunk at a time.
+
+    Each read fetches at most ``chunk`` rows, so a large sheet never arrives
+    as one huge response. With ``archive_dir`` the rows ``archive.py`` moved
+    out come first, as one extra chunk.
+    """
+    if archive_dir:
+        from archive import archived_rows
+        yield archived_rows(name, archive_dir)
+    ws = sheet.worksheet(name)
+    start = 2
+    while True:
+        rows = ws.get(f"A{start}:{last_column}{start + chunk - 1}")
+        yield rows
+        if len(rows) < chunk:
+            return
+        start += chunk
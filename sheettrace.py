@@ -0,0 +1,553 @@
+"""Record the Sheets calls of a real meeting and replay them later.
+
+Set ``trace_file = "traces/2025-06-10.jsonl"`` in the secrets and every
+gspread call the app (or ``api.py``) makes goes through ``TracedClient``,
+which appends one JSON line per call: offset from the start, thread,
+operation, worksheet, arguments, request and response size, latency and
+outcome. The arguments hold member names and phones, so keep traces out of
+git like the secrets.
+
+``replay`` drives the same sequence, on the same schedule, against any
+object that looks like a gspread ``Spreadsheet``: the live sheet, the
+in-memory ``MemorySpreadsheet`` or the ``SQLiteSpreadsheet`` file, either
+seeded from a ``snapshot.py`` export::
+
+    python sheettrace.py summary TRACE
+    python sheettrace.py replay TRACE [--speed 10] [--fake SNAPSHOT_DIR] [--sqlite DB] [--latency MS]
+
+``--speed 0`` fires every call as soon as the previous ones allow.
+``--sqlite DB`` replays against that file, first loaded from ``--fake``
+when both are given. Without either the replay writes to the spreadsheet
+in the secrets, so point those at a copy.
+"""
+import json
+import os
+import re
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+
+def payload_bytes(value):
+    return len(json.dumps(value, default=str))
+
+
+class Recorder:
+    """Appends trace records to a JSONL file, one per call"""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, "a", buffering=1)
+        self.start = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def call(self, level, worksheet, op, method, args, kwargs):
+        started = time.perf_counter()
+        record = {
+            "t": round(started - self.start, 4),
+            "thread": threading.current_thread().name,
+            "level": level,
+            "op": op,
+            "worksheet": worksheet,
+            "args": json.loads(json.dumps(args, default=str)),
+            "kwargs": json.loads(json.dumps(kwargs, default=str)),
+            "request_bytes": payload_bytes([args, kwargs]),
+        }
+        try:
+            result = method(*args, **kwargs)
+        except Exception as e:
+            record.update(ms=self._ms(started), ok=False, error=f"{type(e).__name__}: {e}")
+            self._write(record)
+            raise
+        record.update(ms=self._ms(started), ok=True, response_bytes=payload_bytes(result))
+        self._write(record)
+        return result
+
+    @staticmethod
+    def _ms(started):
+        return round((time.perf_counter() - started) * 1000, 2)
+
+    def _write(self, record):
+        line = json.dumps(record)
+        with self.lock:
+            self.file.write(line + "\n")
+
+    def close(self):
+        self.file.close()
+
+
+class _Traced:
+    """Proxy that records every method call on the wrapped object"""
+
+    level = None
+
+    def __init__(self, target, recorder, worksheet=None):
+        self._target = target
+        self._recorder = recorder
+        self._worksheet = worksheet
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+
+        def traced(*args, **kwargs):
+            return self._wrap(self._recorder.call(self.level, self._worksheet, name, attr, args, kwargs))
+        return traced
+
+    def _wrap(self, result):
+        return result
+
+
+class TracedWorksheet(_Traced):
+    level = "worksheet"
+
+
+class TracedSpreadsheet(_Traced):
+    level = "spreadsheet"
+
+    def worksheet(self, title):
+        ws = self._recorder.call(self.level, None, "worksheet", self._target.worksheet, (title,), {})
+        return TracedWorksheet(ws, self._recorder, title)
+
+
+class TracedClient(_Traced):
+    """Wraps an authorized gspread client; spreadsheets it opens are traced"""
+
+    level = "client"
+
+    def _wrap(self, result):
+        if hasattr(result, "worksheet"):
+            return TracedSpreadsheet(result, self._recorder)
+        return result
+
+
+def traced_client(client, path):
+    """``client`` unchanged when ``path`` is empty, else wrapped in ``TracedClient``"""
+    return TracedClient(client, Recorder(path)) if path else client
+
+
+def read_trace(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# In-memory backend
+
+_CELL_RE = re.compile(r"^([A-Z]*)(\d*)$")
+
+
+def column_index(letters):
+    n = 0
+    for ch in letters:
+        n = n * 26 + ord(ch) - 64
+    return n
+
+
+def parse_range(a1):
+    """``"A2:F"`` -> ``(2, 1, None, 6)`` (1-based, None = open ended)"""
+    a1 = a1.split("!")[-1].strip("'")
+    if not a1 or not _CELL_RE.match(a1.split(":")[0].upper()):
+        return 1, 1, None, None
+    parts = a1.upper().split(":")
+    start = _CELL_RE.match(parts[0])
+    end = _CELL_RE.match(parts[-1])
+    r0 = int(start.group(2) or 1)
+    c0 = column_index(start.group(1)) if start.group(1) else 1
+    if len(parts) == 1:
+        return r0, c0, r0, c0
+    r1 = int(end.group(2)) if end.group(2) else None
+    c1 = column_index(end.group(1)) if end.group(1) else None
+    return r0, c0, r1, c1
+
+
+class MemoryWorksheet:
+    """The subset of ``gspread.Worksheet`` this repo calls, over a list of rows"""
+
+    def __init__(self, title, rows=(), latency=0.0):
+        self.title = title
+        self.rows = [[str(v) for v in row] for row in rows]
+        self.latency = latency
+        self.lock = threading.Lock()
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _read(self, a1):
+        r0, c0, r1, c1 = parse_range(a1)
+        rows = self.rows[r0 - 1:r1]
+        values = [row[c0 - 1:c1] for row in rows]
+        while values and not any(values[-1]):
+            values.pop()
+        return values
+
+    def _write(self, a1, values):
+        r0, c0, _, _ = parse_range(a1)
+        for i, row in enumerate(values):
+            r = r0 - 1 + i
+            while len(self.rows) <= r:
+                self.rows.append([])
+            target = self.rows[r]
+            target.extend([""] * (c0 - 1 + len(row) - len(target)))
+            target[c0 - 1:c0 - 1 + len(row)] = [str(v) for v in row]
+
+    def get_all_values(self):
+        self._wait()
+        with self.lock:
+            return [list(row) for row in self.rows]
+
+    def acell(self, a1):
+        values = self.get(a1)
+        return SimpleNamespace(value=values[0][0] if values and values[0] else None)
+
+    def get_all_records(self):
+        values = self.get_all_values()
+        if not values:
+            return []
+        header = values[0]
+        return [dict(zip(header, row + [""] * (len(header) - len(row)))) for row in values[1:]]
+
+    def get(self, a1):
+        self._wait()
+        with self.lock:
+            return self._read(a1)
+
+    def batch_get(self, ranges, **kwargs):
+        self._wait()
+        with self.lock:
+            return [self._read(a1) for a1 in ranges]
+
+    def row_values(self, row):
+        self._wait()
+        with self.lock:
+            return list(self.rows[row - 1]) if row <= len(self.rows) else []
+
+    def col_values(self, col):
+        self._wait()
+        with self.lock:
+            return [row[col - 1] if len(row) >= col else "" for row in self.rows]
+
+    def update(self, a1, values=None, **kwargs):
+        self._wait()
+        with self.lock:
+            self._write(a1, values or [])
+
+    def batch_update(self, data, **kwargs):
+        self._wait()
+        with self.lock:
+            for item in data:
+                self._write(item["range"], item["values"])
+
+    def append_rows(self, rows, **kwargs):
+        self._wait()
+        with self.lock:
+            self.rows.extend([str(v) for v in row] for row in rows)
+
+    def append_row(self, row, **kwargs):
+        self.append_rows([row])
+
+    def insert_row(self, values, index=1, **kwargs):
+        self._wait()
+        with self.lock:
+            self.rows.insert(index - 1, [str(v) for v in values])
+
+    def clear(self):
+        self._wait()
+        with self.lock:
+            self.rows = []
+
+    def delete_rows(self, start, end=None):
+        self._wait()
+        with self.lock:
+            del self.rows[start - 1:end or start]
+
+
+class MemorySpreadsheet:
+    """A fake ``gspread.Spreadsheet``; worksheets are created on first use"""
+
+    def __init__(self, tables=None, latency=0.0):
+        self.latency = latency
+        self.sheets = {name: MemoryWorksheet(name, rows, latency) for name, rows in (tables or {}).items()}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_snapshot(cls, directory, latency=0.0):
+        from snapshot import load_snapshot, to_values
+        return cls({name: to_values(table) for name, table in load_snapshot(directory).items()}, latency)
+
+    def worksheet(self, title):
+        with self.lock:
+            ws = self.sheets.get(title)
+            if ws is None:
+                ws = self.sheets[title] = MemoryWorksheet(title, latency=self.latency)
+            return ws
+
+    def add_worksheet(self, title, rows=1000, cols=26, **kwargs):
+        with self.lock:
+            ws = self.sheets[title] = MemoryWorksheet(title, latency=self.latency)
+            return ws
+
+    def values_batch_get(self, ranges, **kwargs):
+        result = []
+        for a1 in ranges:
+            ws = self.worksheet(a1.split("!")[0].strip("'"))
+            result.append({"range": a1, "values": ws.get(a1.split("!")[1] if "!" in a1 else "")})
+        return {"valueRanges": result}
+
+    def values_batch_update(self, body, **kwargs):
+        for item in body.get("data", []):
+            name, _, a1 = item["range"].partition("!")
+            self.worksheet(name.strip("'")).update(a1 or "A1", item["values"])
+
+    def values_batch_clear(self, ranges, **kwargs):
+        for a1 in ranges:
+            self.worksheet(a1.split("!")[0].strip("'")).clear()
+
+
+# SQLite backend
+
+class SQLiteWorksheet(MemoryWorksheet):
+    """``MemoryWorksheet`` with its rows in a SQLite table, one JSON row per sheet row.
+
+    Every read and write is a query, so a replay pays for real I/O and the
+    result survives the process for inspection.
+    """
+
+    def __init__(self, book, title):
+        self.book = book
+        self.title = title
+        self.latency = book.latency
+        # One writer at a time per file; reads and read-modify-writes share it
+        self.lock = book.lock
+
+    def _select(self, first=1, last=None):
+        """Rows ``first``..``last`` as lists, with gaps filled by empty rows"""
+        query = "SELECT row, value FROM sheet_rows WHERE sheet = ? AND row >= ?"
+        params = [self.title, first]
+        if last is not None:
+            query += " AND row <= ?"
+            params.append(last)
+        found = dict(self.book.connect().execute(query, params).fetchall())
+        if not found:
+            return []
+        return [json.loads(found[r]) if r in found else [] for r in range(first, max(found) + 1)]
+
+    def _read(self, a1):
+        r0, c0, r1, c1 = parse_range(a1)
+        values = [row[c0 - 1:c1] for row in self._select(r0, r1)]
+        while values and not any(values[-1]):
+            values.pop()
+        return values
+
+    def _write(self, a1, values):
+        r0, c0, _, _ = parse_range(a1)
+        rows = self._select(r0, r0 + len(values) - 1)
+        rows += [[] for _ in range(len(values) - len(rows))]
+        for target, row in zip(rows, values):
+            target.extend([""] * (c0 - 1 + len(row) - len(target)))
+            target[c0 - 1:c0 - 1 + len(row)] = [str(v) for v in row]
+        self._store(r0, rows)
+
+    def _store(self, first, rows):
+        db = self.book.connect()
+        db.execute("BEGIN IMMEDIATE")
+        db.execute("DELETE FROM sheet_rows WHERE sheet = ? AND row >= ? AND row < ?", (self.title, first, first + len(rows)))
+        db.executemany("INSERT INTO sheet_rows (sheet, row, value) VALUES (?, ?, ?)",
+                       [(self.title, first + i, json.dumps(row)) for i, row in enumerate(rows)])
+        db.execute("COMMIT")
+
+    def _shift(self, first, by):
+        """Move every row from ``first`` down by ``by`` (up when negative)"""
+        self.book.connect().execute("UPDATE sheet_rows SET row = row + ? WHERE sheet = ? AND row >= ?", (by, self.title, first))
+
+    def _last_row(self):
+        return self.book.connect().execute("SELECT MAX(row) FROM sheet_rows WHERE sheet = ?", (self.title,)).fetchone()[0] or 0
+
+    def get_all_values(self):
+        self._wait()
+        with self.lock:
+            return self._select()
+
+    def row_values(self, row):
+        self._wait()
+        with self.lock:
+            return (self._select(row, row) or [[]])[0]
+
+    def col_values(self, col):
+        return [row[col - 1] if len(row) >= col else "" for row in self.get_all_values()]
+
+    def append_rows(self, rows, **kwargs):
+        self._wait()
+        with self.lock:
+            self._store(self._last_row() + 1, [[str(v) for v in row] for row in rows])
+
+    def insert_row(self, values, index=1, **kwargs):
+        self._wait()
+        with self.lock:
+            # No unique key on (sheet, row), so shifting never collides mid-update
+            self._shift(index, 1)
+            self._store(index, [[str(v) for v in values]])
+
+    def clear(self):
+        self._wait()
+        with self.lock:
+            self.book.connect().execute("DELETE FROM sheet_rows WHERE sheet = ?", (self.title,))
+
+    def delete_rows(self, start, end=None):
+        self._wait()
+        end = end or start
+        with self.lock:
+            self.book.connect().execute("DELETE FROM sheet_rows WHERE sheet = ? AND row BETWEEN ? AND ?",
+                                        (self.title, start, end))
+            self._shift(end + 1, start - end - 1)
+
+
+class SQLiteSpreadsheet(MemorySpreadsheet):
+    """A fake ``gspread.Spreadsheet`` in a SQLite file; worksheets are created on first use"""
+
+    def __init__(self, path, latency=0.0):
+        self.path = path
+        self.latency = latency
+        self.lock = threading.RLock()
+        self.local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = self.connect()
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("CREATE TABLE IF NOT EXISTS sheet_rows (sheet TEXT NOT NULL, row INTEGER NOT NULL, value TEXT NOT NULL)")
+        db.execute("CREATE INDEX IF NOT EXISTS sheet_rows_index ON sheet_rows (sheet, row)")
+
+    def connect(self):
+        # sqlite3 connections belong to the thread that opened them
+        db = getattr(self.local, "db", None)
+        if db is None:
+            import sqlite3
+            db = self.local.db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute("PRAGMA busy_timeout=5000")
+        return db
+
+    @classmethod
+    def from_snapshot(cls, directory, path, latency=0.0):
+        """A SQLite file at ``path`` holding the snapshot's worksheets, replacing what it had"""
+        from snapshot import load_snapshot, to_values
+
+        book = cls(path, latency)
+        for name, table in load_snapshot(directory).items():
+            ws = book.worksheet(name)
+            ws.clear()
+            ws.append_rows(to_values(table))
+        return book
+
+    def worksheet(self, title):
+        return SQLiteWorksheet(self, title)
+
+    def add_worksheet(self, title, rows=1000, cols=26, **kwargs):
+        ws = self.worksheet(title)
+        ws.clear()
+        return ws
+
+
+# Replay
+
+def replay(records, sheet, speed=1.0, workers=8):
+    """Issue ``records`` against ``sheet`` on the recorded schedule.
+
+    ``speed`` divides the original offsets (2.0 = twice as fast, 0 = no
+    waiting). Calls run on a small pool so bursts overlap the way they did
+    live. Client calls (``open``) are skipped: ``sheet`` is already open.
+    Returns the replayed records with ``replay_ms`` and ``replay_ok``.
+    """
+    results = []
+    lock = threading.Lock()
+
+    def issue(record):
+        started = time.perf_counter()
+        try:
+            target = sheet.worksheet(record["worksheet"]) if record["worksheet"] else sheet
+            getattr(target, record["op"])(*record["args"], **record["kwargs"])
+            ok = True
+        except Exception:
+            ok = False
+        with lock:
+            results.append(dict(record, replay_ms=round((time.perf_counter() - started) * 1000, 2), replay_ok=ok))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for record in records:
+            if record.get("level") == "client":
+                continue
+            if speed:
+                delay = record["t"] / speed - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            pool.submit(issue, record)
+    return results
+
+
+def summarize(records, key="ms"):
+    """``{op: {"calls", "errors", "p50 ms", "max ms", "bytes"}}`` for a trace or a replay"""
+    by_op = defaultdict(list)
+    for record in records:
+        if key in record:
+            by_op[record["op"]].append(record)
+    summary = {}
+    for op, calls in sorted(by_op.items()):
+        ms = sorted(c[key] for c in calls)
+        summary[op] = {
+            "calls": len(calls),
+            "errors": sum(1 for c in calls if not c.get("replay_ok" if key == "replay_ms" else "ok", True)),
+            "p50 ms": statistics.median(ms),
+            "max ms": ms[-1],
+            "bytes": sum(c.get("request_bytes", 0) + c.get("response_bytes", 0) for c in calls),
+        }
+    return summary
+
+
+def print_summary(summary):
+    print(f"{'op':<20}{'calls':>7}{'errors':>8}{'p50 ms':>10}{'max ms':>10}{'bytes':>12}")
+    for op, row in summary.items():
+        print(f"{op:<20}{row['calls']:>7}{row['errors']:>8}{row['p50 ms']:>10.1f}{row['max ms']:>10.1f}{row['bytes']:>12}")
+
+
+def main(argv):
+    args = [a for a in argv[1:] if not a.startswith("--")]
+    if len(args) < 2 or args[0] not in ("summary", "replay"):
+        print(__doc__)
+        return 2
+
+    def option(name, default=None):
+        return argv[argv.index(name) + 1] if name in argv else default
+
+    records = read_trace(args[1])
+    if args[0] == "summary":
+        print_summary(summarize(records))
+        return 0
+
+    latency = float(option("--latency", 0)) / 1000
+    if "--sqlite" in argv and "--fake" in argv:
+        sheet = SQLiteSpreadsheet.from_snapshot(option("--fake"), option("--sqlite"), latency)
+    elif "--sqlite" in argv:
+        sheet = SQLiteSpreadsheet(option("--sqlite"), latency)
+    elif "--fake" in argv:
+        sheet = MemorySpreadsheet.from_snapshot(option("--fake"), latency)
+    else:
+        from sheets import open_spreadsheet
+        sheet = open_spreadsheet()
+    speed = float(option("--speed", 1))
+    started = time.perf_counter()
+    results = replay(records, sheet, speed)
+    print(f"Replayed {len(results)} calls in {time.perf_counter() - started:.1f}s")
+    print_summary(summarize(results, key="replay_ms"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
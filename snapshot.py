@@ -0,0 +1,160 @@
+"""Columnar local snapshot of the attendance spreadsheet.
+
+``export`` pulls every worksheet in one ``values:batchGet`` request and writes
+each one as a typed Arrow IPC file. ``load_snapshot`` memory-maps the files
+back, so the app and the reports can start from local data in milliseconds.
+
+Usage::
+
+    python snapshot.py export [DIR] [--uncompressed]
+    python snapshot.py import [DIR]     # write a snapshot back to the sheets
+"""
+import json
+import os
+import re
+import sys
+from datetime import datetime, timezone
+
+import pyarrow as pa
+
+WORKSHEETS = ["Members", "Attendance", "Attendance_Member", "Guest", "rating"]
+DEFAULT_DIR = "snapshot"
+MANIFEST = "manifest.json"
+
+INT_RE = re.compile(r"^-?(0|[1-9]\d{0,17})$")
+DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+TIMESTAMP_RE = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$")
+
+
+def fetch_values(sheet, names=WORKSHEETS):
+    """Read all worksheets with a single batched API call"""
+    response = sheet.values_batch_get([f"'{name}'" for name in names])
+    return {name: vr.get("values", []) for name, vr in zip(names, response["valueRanges"])}
+
+
+def column_names(header, width):
+    names, seen = [], set()
+    for i in range(width):
+        name = header[i] if i < len(header) and header[i] else f"column_{i + 1}"
+        while name in seen:
+            name += "_"
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def typed_column(name, cells):
+    """Pick the narrowest Arrow type that holds every non-empty cell"""
+    present = [c for c in cells if c != ""]
+    if "phone" in name.lower() or not present:
+        array = pa.array([c or None for c in cells], type=pa.string())
+    elif all(c == "1" for c in present):
+        # Attendance_Member presence cells
+        return pa.array([c == "1" for c in cells], type=pa.bool_())
+    elif all(INT_RE.match(c) for c in present):
+        return pa.array([int(c) if c else None for c in cells], type=pa.int64())
+    elif all(DATE_RE.match(c) for c in present):
+        return pa.array([datetime.strptime(c, "%Y-%m-%d").date() if c else None for c in cells], type=pa.date32())
+    elif all(TIMESTAMP_RE.match(c) for c in present):
+        parsed = [datetime.strptime(c, "%Y-%m-%d %H:%M:%S") if c else None for c in cells]
+        return pa.array(parsed, type=pa.timestamp("s"))
+    else:
+        array = pa.array([c or None for c in cells], type=pa.string())
+    # Names and types repeat on every attendance row
+    if len(set(present)) * 2 < len(present):
+        return array.dictionary_encode()
+    return array
+
+
+def to_table(values):
+    """Convert ``get_all_values``-style rows (header first) into a typed table"""
+    if not values:
+        return pa.table({})
+    header, rows = values[0], values[1:]
+    width = max(len(r) for r in values)
+    names = column_names(header, width)
+    columns = [[r[i] if i < len(r) else "" for r in rows] for i in range(width)]
+    return pa.table([typed_column(n, c) for n, c in zip(names, columns)], names=names)
+
+
+def cell(value):
+    if value is None or value is False:
+        return ""
+    if value is True:
+        return "1"
+    return str(value)
+
+
+def to_values(table):
+    """Inverse of ``to_table``: header row followed by rows of strings"""
+    columns = [[cell(v) for v in col.to_pylist()] for col in table.columns]
+    return [list(table.column_names)] + [list(row) for row in zip(*columns)]
+
+
+def to_records(table):
+    """Rows as dicts, the shape ``get_all_records`` returns"""
+    return table.to_pylist()
+
+
+def export(sheet, directory=DEFAULT_DIR, compression="zstd"):
+    os.makedirs(directory, exist_ok=True)
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    counts = {}
+    for name, values in fetch_values(sheet).items():
+        table = to_table(values)
+        tmp = os.path.join(directory, f"{name}.arrow.tmp")
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema, options=options) as writer:
+            writer.write_table(table)
+        os.replace(tmp, os.path.join(directory, f"{name}.arrow"))
+        counts[name] = table.num_rows
+    manifest = {
+        "exported_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "compression": compression,
+        "rows": counts,
+    }
+    with open(os.path.join(directory, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_snapshot(directory=DEFAULT_DIR, names=WORKSHEETS):
+    """Memory-map the snapshot tables. Missing worksheets are skipped."""
+    tables = {}
+    for name in names:
+        path = os.path.join(directory, f"{name}.arrow")
+        if os.path.exists(path):
+            tables[name] = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    return tables
+
+
+def restore(sheet, directory=DEFAULT_DIR):
+    """Write every table in the snapshot back to its worksheet (one clear, one write)"""
+    tables = load_snapshot(directory)
+    sheet.values_batch_clear([f"'{name}'" for name in tables])
+    sheet.values_batch_update({
+        "valueInputOption": "RAW",
+        "data": [{"range": f"'{name}'!A1", "values": to_values(t)} for name, t in tables.items()],
+    })
+    return {name: t.num_rows for name, t in tables.items()}
+
+
+def main(argv):
+    from sheets import open_spreadsheet
+
+    args = [a for a in argv[1:] if not a.startswith("--")]
+    if not args or args[0] not in ("export", "import"):
+        print(__doc__)
+        return 2
+    directory = args[1] if len(args) > 1 else DEFAULT_DIR
+    sheet = open_spreadsheet()
+    if args[0] == "export":
+        compression = None if "--uncompressed" in argv else "zstd"
+        manifest = export(sheet, directory, compression)
+        print(json.dumps(manifest["rows"], indent=2))
+    else:
+        print(json.dumps(restore(sheet, directory), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,261 @@
+"""Serve several clubs from one process.
+
+Clubs are configured in the Streamlit secrets::
+
+    [clubs.koramangala]
+    spreadsheet = "Toastmasters Attendance"
+    title = "Koramangala Toastmasters Club"
+    snapshot_dir = "snapshots/koramangala"   # optional
+    archive_dir = "archive/koramangala"      # optional, see archive.py
+    code_secret = "..."                      # optional, else meeting_code_secret
+    meeting_start = "19:00"                  # optional, first code window starts here
+    require_code = true                      # optional, phones must enter the meeting code
+    journal_dir = "journal"                  # optional, queued rows kept on disk
+
+and picked with ``?club=koramangala``. Without a ``[clubs]`` table the app
+serves the single ``Toastmasters Attendance`` spreadsheet as before.
+
+Every club shares one authorized gspread client, and with it one HTTP
+session and connection pool. The per-club state (spreadsheet handle, member
+index, board, ratings, attendance history, write queue) lives in an LRU that
+evicts the least recently used club when the total estimated size passes the
+cap.
+"""
+import logging
+import os
+import sys
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from aiosheets import sheets_io
+from checkin import CODE_GRACE, CODE_WINDOW, CheckinService, Journal, code_window, verify_meeting_code
+from checkin import meeting_code as derive_meeting_code
+from eventlog import Projector
+from guests import GuestIndex
+from health import SheetsHealth
+from history import AttendanceHistory
+from liveboard import LiveBoard
+from ratings import RatingAggregator
+from report import MeetingReports
+from sharedcache import LocalCache
+from sheets import SPREADSHEET_NAME
+
+DEFAULT_CLUB = "default"
+DEFAULT_TITLE = "Koramangala Toastmasters Club"
+TIMEZONE = ZoneInfo("Asia/Kolkata")
+JOURNAL_DIR = "journal"
+
+logger = logging.getLogger(__name__)
+
+
+def club_configs(secrets):
+    """``{slug: config}`` from the secrets, or the single legacy club"""
+    clubs = {slug: dict(config) for slug, config in dict(secrets.get("clubs", {})).items()}
+    if not clubs:
+        clubs[DEFAULT_CLUB] = {
+            "spreadsheet": SPREADSHEET_NAME,
+            "title": DEFAULT_TITLE,
+            "snapshot_dir": secrets.get("snapshot_dir"),
+            "archive_dir": secrets.get("archive_dir"),
+            "journal_dir": secrets.get("journal_dir"),
+        }
+    # Meeting codes are derived per club from one secret unless a club sets its own
+    for config in clubs.values():
+        config.setdefault("code_secret", secrets.get("meeting_code_secret") or secrets.get("token_secret"))
+        config.setdefault("code_minutes", secrets.get("meeting_code_minutes", CODE_WINDOW // 60))
+        config.setdefault("code_grace_minutes", secrets.get("meeting_code_grace_minutes", CODE_GRACE // 60))
+        config.setdefault("meeting_start", secrets.get("meeting_start", "00:00"))
+        config.setdefault("require_code", secrets.get("require_meeting_code", False))
+    return clubs
+
+
+def load_club_snapshot(directory):
+    """The snapshot tables a club boots from, or {} if none is configured"""
+    if not directory:
+        return {}
+    from snapshot import load_snapshot
+    return load_snapshot(directory, names=["Members", "Attendance_Member"])
+
+
+def snapshot_members(snapshot):
+    """Member records from the snapshot tables, or [] without a Members table"""
+    if "Members" not in snapshot:
+        return []
+    from snapshot import to_records
+    return to_records(snapshot["Members"])
+
+
+class Club:
+    """Everything one club needs at runtime"""
+
+    def __init__(self, slug, config, client, tz, projector_interval=15, cache=None):
+        self.slug = slug
+        self.title = config.get("title") or slug
+        self.tz = tz
+        self.sheet = client.open(config.get("spreadsheet") or SPREADSHEET_NAME)
+        self.cache = cache or LocalCache()
+        self.code_secret = config.get("code_secret")
+        self.code_window = int(config.get("code_minutes") or CODE_WINDOW // 60) * 60
+        self.code_grace = int(config.get("code_grace_minutes") or 0) * 60
+        hours, _, minutes = str(config.get("meeting_start") or "00:00").partition(":")
+        self.code_start = int(hours) * 3600 + int(minutes or 0) * 60
+        self.require_code = bool(config.get("require_code")) and bool(self.code_secret)
+
+        # Probes Sheets; while it is degraded, writes wait in the journal and the projector pauses
+        self.health = SheetsHealth(self.sheet)
+
+        # Keeps Attendance, Guest and Attendance_Member in sync with the Events log
+        self.projector = Projector(self.sheet, self.cache, f"{slug}:projector")
+
+        self.ratings = RatingAggregator()
+        self.guests = GuestIndex()
+        # Seeded from the snapshot, else from the matrix when the admin view first needs it
+        self.history = AttendanceHistory()
+        snapshot = load_club_snapshot(config.get("snapshot_dir"))
+        members = snapshot_members(snapshot)
+        if "Attendance_Member" in snapshot:
+            from analytics import AttendanceMatrix
+            self.history.seed_matrix(AttendanceMatrix.from_table(snapshot["Attendance_Member"]))
+            self.history.seeded = True
+        self.service = CheckinService(self.sheet, tz, seed_records=members,
+                                      cache=self.cache, cache_prefix=f"{slug}:", health=self.health,
+                                      journal=Journal(os.path.join(config.get("journal_dir") or JOURNAL_DIR, f"{slug}.jsonl")))
+        self.board = LiveBoard(today=self.service.today)
+        # Read the roster, ratings, guests and today's check-ins at once: loading a club takes the slowest read, not the sum
+        loads = [
+            lambda: self.ratings.seed(self.sheet, archive_dir=config.get("archive_dir")),
+            lambda: self.guests.seed(self.sheet, archive_dir=config.get("archive_dir")),
+            self.service.today_events,
+        ]
+        if not members:
+            # A snapshot roster is enough to start; a lookup miss still reads Members
+            loads.append(self.service.members.refresh)
+        events = sheets_io().gather(*loads)[2]
+        self.service.seed_seen(events)
+        # A restart mid-meeting shows tonight's check-ins and ratings so far, not an empty board
+        today = self.service.today()
+        self.board.seed(today, events, self.ratings.meetings.get(today))
+        self.reports = MeetingReports(self.sheet, self.ratings, self.guests)
+        # Seed ratings and guests before the queue starts so nothing new is counted twice
+        self.service.subscribe(self.ratings.on_event)
+        self.service.subscribe(self.guests.on_event)
+        self.service.subscribe(self.reports.on_event)
+        self.service.subscribe(self.history.on_event)
+        self.service.subscribe(self.board.apply)
+        # Threads start only once loading has succeeded; a failed load leaves nothing running
+        self.health.start()
+        self.projector.start(projector_interval, paused=lambda: self.health.degraded)
+        self.service.start()
+
+    def check_in_guest(self, name, phone):
+        """Check a guest in unless they already are today.
+
+        Returns ``(name, visits, already_checked_in)``; ``visits`` counts today.
+        """
+        today = self.service.now().strftime("%Y-%m-%d")
+        record = self.guests.get(phone)
+        if record and record.last_visit == today:
+            return record.name, record.visits, True
+        self.service.check_in_guest(name, phone)
+        record = self.guests.get(phone)
+        return record.name, record.visits, False
+
+    def meeting_code(self, at=None):
+        """This window's code and when it expires, grace included, computed locally.
+
+        Returns ``(code, valid_until)``; any replica with the same secret derives the same code.
+        """
+        if not self.code_secret:
+            raise RuntimeError("Set meeting_code_secret in the secrets to use meeting codes")
+        at = at or datetime.now(self.tz)
+        local = self._local_seconds(at)
+        number, ends = code_window(local, self.code_window, self.code_start)
+        code = derive_meeting_code(self.code_secret, number, self.slug)
+        return code, at + timedelta(seconds=ends - local + self.code_grace)
+
+    def verify_meeting_code(self, code, at=None):
+        """True for this window's code, or the last one's within the grace period"""
+        if not self.code_secret:
+            return False
+        local = self._local_seconds(at or datetime.now(self.tz))
+        return verify_meeting_code(code, self.code_secret, local, self.slug,
+                                   self.code_window, self.code_grace, self.code_start)
+
+    @staticmethod
+    def _local_seconds(at):
+        # Windows start on the club's local hour, not the UTC one
+        return at.timestamp() + at.utcoffset().total_seconds()
+
+    def nbytes(self):
+        """Rough size of the cached per-club state"""
+        return (
+            self.service.members.roster.nbytes()
+            + sum(sys.getsizeof(a) for a in self.board.attendees)
+            + sum(sys.getsizeof(g) for g in self.guests.by_phone.values())
+            + 200 * len(self.ratings.meetings)
+            + self.history.nbytes()
+        )
+
+    def close(self):
+        self.health.stop()
+        self.projector.stop()
+        self.service.stop()
+
+
+class ClubRegistry:
+    """LRU of ``Club`` objects sharing one gspread client"""
+
+    def __init__(self, client, configs, tz, max_bytes=64 * 1024 * 1024, projector_interval=15, cache=None):
+        self.client = client
+        self.configs = configs
+        self.tz = tz
+        self.cache = cache or LocalCache()
+        self.max_bytes = max_bytes
+        self.projector_interval = projector_interval
+        self.clubs = OrderedDict()
+        self.lock = threading.Lock()
+        # One lock per club: loading a club (several Sheets reads) holds only its own
+        self.loading = {slug: threading.Lock() for slug in configs}
+
+    def default_slug(self):
+        return next(iter(self.configs))
+
+    def get(self, slug=None):
+        slug = slug or self.default_slug()
+        if slug not in self.configs:
+            raise KeyError(f"Unknown club: {slug}")
+        club = self._cached(slug)
+        if club is not None:
+            return club
+        with self.loading[slug]:
+            # Another request may have loaded it while this one waited
+            club = self._cached(slug)
+            if club is not None:
+                return club
+            club = Club(slug, self.configs[slug], self.client, self.tz, self.projector_interval, self.cache)
+            with self.lock:
+                self.clubs[slug] = club
+                evicted = self._evict()
+        for name, old in evicted:
+            logger.info("Evicting club %s from the cache", name)
+            old.close()
+        return club
+
+    def _cached(self, slug):
+        with self.lock:
+            club = self.clubs.get(slug)
+            if club is not None:
+                self.clubs.move_to_end(slug)
+            return club
+
+    def _evict(self):
+        """Drop least recently used clubs over the cap; the caller closes them outside the lock"""
+        evicted = []
+        total = sum(c.nbytes() for c in self.clubs.values())
+        while total > self.max_bytes and len(self.clubs) > 1:
+            slug, club = self.clubs.popitem(last=False)
+            total -= club.nbytes()
+            evicted.append((slug, club))
+        return evicted
@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+import archive
+from sheettrace import MemorySpreadsheet
+
+HEADER = ["Date", "Type", "Name", "Phone", "Code"]
+
+
+def row(date, name):
+    return [date, "Member", name, name, "0000"]
+
+
+def test_archive_twice_keeps_every_row(tmp_path):
+    directory = str(tmp_path)
+    sheet = MemorySpreadsheet({"Attendance": [
+        HEADER, row("2026-01-01", "a"), row("2026-05-01", "b"), row("2026-01-03", "late"), row("2026-06-01", "c"),
+    ]})
+
+    assert archive.archive_sheet(sheet, "Attendance", "2026-02-01", directory, apply=True) == 2
+    live = sheet.worksheet("Attendance").rows
+    assert archive.is_summary(live[1])
+    assert [r[2] for r in live[2:]] == ["b", "c"]
+
+    # A back-dated row added later, then the same cutoff again
+    sheet.worksheet("Attendance").append_rows([row("2026-01-05", "back")])
+    assert archive.archive_sheet(sheet, "Attendance", "2026-02-01", directory, apply=True) == 1
+
+    live = sheet.worksheet("Attendance").rows
+    assert live[1][1] == "[archived 3 rows before 2026-02-01]"
+    assert [r[2] for r in live[2:]] == ["b", "c"]
+    parts = archive.read_manifest(directory, "Attendance")["parts"]
+    assert [p["rows"] for p in parts] == [2, 1]
+    assert len({p["file"] for p in parts}) == 2
+    assert [r[2] for r in archive.archived_rows("Attendance", directory)] == ["a", "late", "back"]
+    assert [r[2] for r in archive.merged_values(sheet, "Attendance", directory)[1:]] == ["a", "late", "back", "b", "c"]
+
+
+def test_archive_refuses_to_overwrite_unlisted_part(tmp_path):
+    directory = str(tmp_path)
+    sheet = MemorySpreadsheet({"Attendance": [HEADER, row("2026-01-01", "a")]})
+    os.makedirs(tmp_path / "Attendance")
+    (tmp_path / "Attendance" / "Attendance-0001-before-2026-02-01.arrow").write_bytes(b"kept")
+
+    with pytest.raises(FileExistsError):
+        archive.archive_sheet(sheet, "Attendance", "2026-02-01", directory, apply=True)
+    assert sheet.worksheet("Attendance").rows[1] == row("2026-01-01", "a")
+
+
+def test_dry_run_changes_nothing(tmp_path):
+    sheet = MemorySpreadsheet({"Attendance": [HEADER, row("2026-01-01", "a")]})
+
+    assert archive.archive_sheet(sheet, "Attendance", "2026-02-01", str(tmp_path)) == 1
+    assert sheet.worksheet("Attendance").rows == [HEADER, row("2026-01-01", "a")]
+    assert not os.listdir(tmp_path)
@@ -0,0 +1,124 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+from gspread.exceptions import WorksheetNotFound
+
+import eventlog
+from eventlog import EVENT_HEADERS, VIEWS, Projector, make_event, migrate
+from sheettrace import MemorySpreadsheet
+
+TZ = ZoneInfo("Asia/Kolkata")
+MEETING = datetime(2026, 10, 15, 19, 5, tzinfo=TZ)
+
+
+class StrictSpreadsheet(MemorySpreadsheet):
+    """Raises ``WorksheetNotFound`` like gspread instead of creating the sheet"""
+
+    def worksheet(self, title):
+        if title not in self.sheets:
+            raise WorksheetNotFound(title)
+        return super().worksheet(title)
+
+
+def new_sheet(events=()):
+    return MemorySpreadsheet({
+        "Events": [EVENT_HEADERS] + list(events),
+        "Projector": [list(VIEWS), ["1", "1", "1"]],
+        "Attendance": [["Date", "Type", "Name", "Phone", "Code"]],
+        "Guest": [["Date", "Name", "Referred By", "Phone", "Code"]],
+        "Attendance_Member": [],
+    })
+
+
+def cursors(sheet):
+    return sheet.worksheet("Projector").rows
+
+
+def test_project_writes_each_view_once():
+    sheet = new_sheet([make_event("Member", "Bob", "333", MEETING), make_event("Guest", "Gia", "444", MEETING)])
+    projector = Projector(sheet)
+
+    assert projector.run() == 2
+    assert sheet.worksheet("Attendance").rows[1:] == [
+        ["2026-10-15", "Member", "Bob", "333", "0000"],
+        ["2026-10-15", "Guest", "Gia", "444", "0000"],
+    ]
+    assert sheet.worksheet("Guest").rows[1:] == [["2026-10-15", "Gia", "None", "444", "0000"]]
+    assert sheet.worksheet("Attendance_Member").rows == [["Name", "Phone", "2026-10-15"], ["Bob", "333", "1"]]
+    assert cursors(sheet) == [list(VIEWS), ["3", "3", "3"]]
+    # Nothing new: no view is written again
+    assert projector.run() == 0
+    assert len(sheet.worksheet("Attendance").rows) == 3
+
+
+def test_projection_resumes_legacy_cursor():
+    sheet = new_sheet([make_event("Member", "Bob", "333", MEETING)])
+    sheet.worksheet("Projector").rows = [[eventlog.LEGACY_CURSOR], ["1"]]
+
+    assert Projector(sheet).run() == 1
+    assert cursors(sheet) == [list(VIEWS), ["2", "2", "2"]]
+
+
+def test_failed_view_is_replayed_alone():
+    sheet = new_sheet([make_event("Member", "Bob", "333", MEETING), make_event("Guest", "Gia", "444", MEETING)])
+    matrix = sheet.worksheet("Attendance_Member")
+    batch_update = matrix.batch_update
+    calls = []
+
+    def fail_once(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 1:
+            raise RuntimeError("503 from Sheets")
+        return batch_update(*args, **kwargs)
+
+    matrix.batch_update = fail_once
+    projector = Projector(sheet)
+    with pytest.raises(RuntimeError):
+        projector.run()
+    # The views that were written moved on; the matrix kept its cursor
+    assert cursors(sheet) == [list(VIEWS), ["3", "3", "1"]]
+
+    assert projector.run() == 2
+    assert cursors(sheet) == [list(VIEWS), ["3", "3", "3"]]
+    assert len(sheet.worksheet("Attendance").rows) == 3
+    assert len(sheet.worksheet("Guest").rows) == 2
+    assert matrix.rows == [["Name", "Phone", "2026-10-15"], ["Bob", "333", "1"]]
+
+
+def test_migrate_adds_events_and_projector():
+    sheet = StrictSpreadsheet({"Attendance": [
+        ["Date", "Type", "Name", "Phone"],
+        ["2026-10-01", "Member", "Asha", "111"],
+        ["2026-10-01", "Guest", "Gia", "444"],
+        ["2026-10-01", "Note", "", ""],
+    ]})
+
+    assert migrate(sheet) == 2
+    events = sheet.sheets["Events"].rows
+    assert events[0] == EVENT_HEADERS
+    assert [row[1:] for row in events[1:]] == [
+        ["2026-10-01 00:00:00", "2026-10-01", "Member", "Asha", "111"],
+        ["2026-10-01 00:00:00", "2026-10-01", "Guest", "Gia", "444"],
+    ]
+    assert sheet.sheets["Projector"].rows == [list(VIEWS), ["3", "3", "3"]]
+    with pytest.raises(RuntimeError):
+        migrate(sheet)
+
+
+def test_rebuild_matches_incremental_projection():
+    events = [
+        make_event("Member", "Bob", "333", MEETING),
+        make_event("Guest", "Gia", "444", MEETING),
+        make_event("Member", "Cat", "222", datetime(2026, 10, 22, 19, 0, tzinfo=TZ)),
+    ]
+    projected, rebuilt = new_sheet(events), new_sheet(events)
+    Projector(projected).run()
+    # Stale views and cursors are replaced, not appended to
+    rebuilt.worksheet("Attendance").append_rows([["2020-01-01", "Member", "Stale", "999", "0000"]])
+
+    assert Projector(rebuilt).rebuild() == 3
+    for view in VIEWS:
+        assert rebuilt.worksheet(view).rows == projected.worksheet(view).rows
+    assert cursors(rebuilt) == [list(VIEWS), ["4", "4", "4"]]
+    assert Projector(rebuilt).run() == 0
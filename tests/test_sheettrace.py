@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+from sheettrace import MemorySpreadsheet, Recorder, SQLiteSpreadsheet, TracedSpreadsheet, read_trace, replay
+
+
+def exercise(sheet):
+    """The worksheet calls the app, projector and archive make, in one sequence"""
+    ws = sheet.worksheet("Attendance")
+    ws.update("A1", [["Date", "Type", "Name", "Phone"]])
+    ws.append_rows([["2026-10-01", "Member", "a", "1"], ["2026-10-02", "Member", "b", "2"], ["2026-10-03", "Guest", "c", "3"]])
+    ws.batch_update([{"range": "E1", "values": [["Code"]]}, {"range": "D6", "values": [["6"]]}])
+    ws.insert_row(["2026-09-30", "[archived 1 rows]"], 2)
+    ws.delete_rows(3, 4)
+    sheet.values_batch_update({"data": [{"range": "Events!A1", "values": [["Event ID"]]}]})
+    return [
+        ws.get_all_values(),
+        ws.get("B2:C"),
+        ws.batch_get(["1:1", "B:B"]),
+        ws.row_values(2),
+        ws.col_values(3),
+        ws.acell("A1").value,
+        sheet.values_batch_get(["Events!A1"]),
+    ]
+
+
+def test_sqlite_matches_memory(tmp_path):
+    assert exercise(SQLiteSpreadsheet(str(tmp_path / "sheet.db"))) == exercise(MemorySpreadsheet())
+
+
+def test_sqlite_keeps_rows_across_opens(tmp_path):
+    path = str(tmp_path / "sheet.db")
+    SQLiteSpreadsheet(path).worksheet("Members").append_rows([["Name", "Phone Number"], ["Asha", "111"]])
+
+    assert SQLiteSpreadsheet(path).worksheet("Members").get_all_records() == [{"Name": "Asha", "Phone Number": "111"}]
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_replay_reproduces_recorded_writes(tmp_path, backend):
+    recorded = MemorySpreadsheet()
+    recorder = Recorder(str(tmp_path / "trace.jsonl"))
+    exercise(TracedSpreadsheet(recorded, recorder))
+    recorder.close()
+    records = read_trace(str(tmp_path / "trace.jsonl"))
+    assert all("ms" in r and json.dumps(r) for r in records)
+
+    target = MemorySpreadsheet() if backend == "memory" else SQLiteSpreadsheet(str(tmp_path / "replay.db"))
+    # One worker keeps the recorded order, so the result is deterministic
+    results = replay(records, target, speed=0, workers=1)
+
+    assert all(r["replay_ok"] for r in results)
+    assert target.worksheet("Attendance").get_all_values() == recorded.worksheet("Attendance").get_all_values()